@@ -0,0 +1,208 @@
+# artifact_store.py
+#
+# Screenshots taken during a run, stored per link and per run instead of
+# fixed file names in the working directory. Frames are encoded to WebP/JPEG
+# in a worker thread, near-duplicates of the previous frame of the same run
+# are dropped, and the directory is kept under a byte budget by evicting the
+# oldest files first.
+
+import asyncio
+import hashlib
+import io
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from link_store import url_domain
+from metrics import current_trace, lazy_import
+
+
+FORMATS = {"webp": "WEBP", "jpeg": "JPEG", "png": "PNG"}
+# WebP cannot encode images taller or wider than this; longer pages fall back to JPEG
+WEBP_MAX_DIMENSION = 16383
+
+
+def dhash(image, size: int = 8) -> int:
+    """
+    Difference hash: one bit per horizontally adjacent pixel pair of a tiny
+    grayscale thumbnail. Visually similar frames differ in only a few bits.
+    """
+    small = image.convert("L").resize((size + 1, size), lazy_import("PIL.Image").BILINEAR)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return bits
+
+
+def link_key(link: str) -> str:
+    domain = re.sub(r"[^a-z0-9.-]", "_", (url_domain(link) or "unknown").lower())
+    return f"{domain}-{hashlib.sha1(link.encode()).hexdigest()[:10]}"
+
+
+class ArtifactStore:
+    def __init__(self, directory: str = "data/artifacts", fmt: str = "webp", quality: int = 70,
+                 max_bytes: int = 500 * 1024 * 1024, dedupe_distance: int = 4):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown artifact format: {fmt} (expected one of {', '.join(FORMATS)})")
+        self.directory = directory
+        self.fmt = fmt
+        self.quality = quality
+        self.max_bytes = max_bytes
+        self.dedupe_distance = dedupe_distance
+        self._lock = threading.Lock()
+        self._files = None  # path -> (mtime, size), oldest first; loaded on first save
+        self._total = 0
+        self._last_hash = OrderedDict()  # run_id -> dhash of its last stored frame
+        self.saved = 0
+        self.duplicates = 0
+        self.evicted = 0
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            directory=os.getenv("ARTIFACT_DIR", "data/artifacts"),
+            fmt=os.getenv("ARTIFACT_FORMAT", "webp").lower(),
+            quality=int(os.getenv("ARTIFACT_QUALITY", "70")),
+            max_bytes=int(float(os.getenv("ARTIFACT_MAX_MB", "500")) * 1024 * 1024),
+            dedupe_distance=int(os.getenv("ARTIFACT_DEDUPE_DISTANCE", "4")),
+        )
+
+    def scope(self, name: str, max_bytes: int):
+        """
+        Confines this process to its own subdirectory and share of the disk
+        budget. Sharded workers (see shard_runner.py) each get one, so the
+        shards together stay within ARTIFACT_MAX_MB.
+        """
+        with self._lock:
+            self.directory = os.path.join(self.directory, name)
+            self.max_bytes = max_bytes
+            self._files = None
+            self._total = 0
+
+    async def save(self, name: str, png_bytes: bytes, link: str = None, run_id: str = None):
+        """
+        Stores a screenshot and returns its path, or None when it was dropped
+        as a near-duplicate. `link` and `run_id` default to the current trace.
+        """
+        trace = current_trace.get()
+        if trace is not None:
+            link = link or trace.subject
+            run_id = run_id or trace.run_id
+        try:
+            return await asyncio.to_thread(self._save, name, png_bytes, link or "unknown", run_id or "adhoc")
+        except Exception as e:
+            print(f"⚠️ Could not store artifact {name}: {e}")
+            return None
+
+    def _save(self, name: str, png_bytes: bytes, link: str, run_id: str):
+        image = lazy_import("PIL.Image").open(io.BytesIO(png_bytes))
+        image.load()
+
+        if self.dedupe_distance >= 0:
+            fingerprint = dhash(image)
+            with self._lock:
+                previous = self._last_hash.get(run_id)
+                self._last_hash[run_id] = fingerprint
+                self._last_hash.move_to_end(run_id)
+                while len(self._last_hash) > 1024:
+                    self._last_hash.popitem(last=False)
+            if previous is not None and bin(previous ^ fingerprint).count("1") <= self.dedupe_distance:
+                with self._lock:
+                    self.duplicates += 1
+                print(f"♻️ Skipped {name}: near-duplicate of the previous frame")
+                return None
+
+        fmt = self.fmt
+        if fmt == "webp" and max(image.size) > WEBP_MAX_DIMENSION:
+            fmt = "jpeg"
+        if fmt == "jpeg" and image.mode != "RGB":
+            image = image.convert("RGB")
+
+        out = io.BytesIO()
+        if fmt == "png":
+            image.save(out, format="PNG", optimize=True)
+        else:
+            image.save(out, format=FORMATS[fmt], quality=self.quality)
+        data = out.getvalue()
+
+        folder = os.path.join(self.directory, link_key(link), run_id)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{name}.{fmt}")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._load_index()
+            if path in self._files:
+                self._total -= self._files.pop(path)[1]
+            self._files[path] = (os.path.getmtime(path), len(data))
+            self._total += len(data)
+            self.saved += 1
+            self.raw_bytes += len(png_bytes)
+            self.stored_bytes += len(data)
+            self._evict(keep=path)
+
+        print(f"🖼️ Stored {name} ({len(png_bytes) // 1024} KB PNG -> {len(data) // 1024} KB {fmt}) at {path}")
+        return path
+
+    def _load_index(self):
+        if self._files is not None:
+            return
+        found = []
+        for root, _, names in os.walk(self.directory):
+            for file_name in names:
+                if file_name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, file_name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                found.append((stat.st_mtime, path, stat.st_size))
+        found.sort()
+        self._files = OrderedDict((path, (mtime, size)) for mtime, path, size in found)
+        self._total = sum(size for _, _, size in found)
+
+    def _evict(self, keep: str):
+        while self._total > self.max_bytes and len(self._files) > 1:
+            path, (_, size) = next(iter(self._files.items()))
+            if path == keep:
+                break
+            self._files.pop(path)
+            self._total -= size
+            try:
+                os.remove(path)
+                # Drop the run and link folders once they are empty
+                os.rmdir(os.path.dirname(path))
+                os.rmdir(os.path.dirname(os.path.dirname(path)))
+            except OSError:
+                pass
+            self.evicted += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._load_index()
+            return {
+                "directory": self.directory,
+                "format": self.fmt,
+                "quality": self.quality,
+                "files": len(self._files),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "saved": self.saved,
+                "duplicates": self.duplicates,
+                "evicted": self.evicted,
+                "compression_ratio": round(self.raw_bytes / self.stored_bytes, 2) if self.stored_bytes else None,
+            }
+
+
+artifacts = ArtifactStore.from_env()
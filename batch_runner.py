@@ -0,0 +1,180 @@
+# batch_runner.py
+
+import asyncio
+import os
+import time
+import uuid
+from collections import defaultdict
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from browser_pool import pool as browser_pool
+from dataexcel import FILE_PATH, read_application_links
+from link_store import url_domain
+from link_state import link_state
+from website_access import open_page_and_capture
+
+
+router = APIRouter()
+JOBS = {}  # job_id -> BatchJob, kept in memory for the lifetime of the process
+
+DEFAULT_PER_DOMAIN = int(os.getenv("BATCH_PER_DOMAIN_CONCURRENCY", "2"))
+DEFAULT_LINK_TIMEOUT = float(os.getenv("BATCH_LINK_TIMEOUT", "300"))
+
+
+class BatchJob:
+    def __init__(self, links, max_concurrency: int, per_domain: int):
+        self.id = uuid.uuid4().hex
+        self.max_concurrency = max_concurrency
+        self.per_domain = per_domain
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.task = None
+        self.links = [
+            {
+                "link": link,
+                "domain": url_domain(link) or "unknown",
+                "status": "pending",
+                "outcome": None,
+                "error": None,
+                "elapsed": None,
+            }
+            for link in links
+        ]
+
+    def progress(self) -> dict:
+        counts = defaultdict(int)
+        for entry in self.links:
+            counts[entry["status"]] += 1
+        finished = counts["done"] + counts["failed"] + counts["skipped"]
+        return {
+            "total": len(self.links),
+            "finished": finished,
+            "percent": round(100 * finished / len(self.links), 1) if self.links else 100.0,
+            **counts,
+        }
+
+    def to_dict(self, include_links: bool = True) -> dict:
+        now = self.finished_at or time.time()
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "max_concurrency": self.max_concurrency,
+            "per_domain": self.per_domain,
+            "progress": self.progress(),
+            "elapsed": round(now - self.started_at, 3) if self.started_at else None,
+        }
+        if include_links:
+            data["links"] = self.links
+        return data
+
+
+async def run_batch(job: BatchJob, pool=browser_pool, link_timeout: float = DEFAULT_LINK_TIMEOUT, state=link_state,
+                    on_entry=None):
+    """
+    Feeds every link of the job through open_page_and_capture, recording
+    each stage in `state` so an interrupted run can be resumed. `on_entry`
+    is called with each entry once its link has finished.
+
+    A link first takes a slot for its domain and only then a global slot, so
+    links waiting on a busy domain never hold back links for other domains.
+    """
+    global_slots = asyncio.Semaphore(job.max_concurrency)
+    domain_slots = defaultdict(lambda: asyncio.Semaphore(job.per_domain))
+
+    async def process(entry):
+        if entry["status"] == "skipped":
+            return
+        async with domain_slots[entry["domain"]]:
+            async with global_slots:
+                entry["status"] = "running"
+                start = time.perf_counter()
+                try:
+                    entry["outcome"] = await asyncio.wait_for(
+                        open_page_and_capture(entry["link"], pool=pool, state=state), timeout=link_timeout)
+                    entry["status"] = "done"
+                except Exception as e:
+                    entry["status"] = "failed"
+                    entry["error"] = f"{type(e).__name__}: {e}"
+                    print(f"❌ Batch {job.id[:8]}: {entry['link']} failed: {entry['error']}")
+                finally:
+                    entry["elapsed"] = round(time.perf_counter() - start, 3)
+                if on_entry:
+                    on_entry(entry)
+
+    job.status = "running"
+    job.started_at = time.time()
+    try:
+        await asyncio.gather(*(process(entry) for entry in job.links))
+        job.status = "completed"
+    except asyncio.CancelledError:
+        job.status = "cancelled"
+        raise
+    finally:
+        job.finished_at = time.time()
+        print(f"✅ Batch {job.id[:8]} {job.status}: {job.progress()}")
+
+
+# =======================
+# Start Batch Run Endpoint
+# =======================
+@router.post("/run-links/")
+async def run_links(max_concurrency: int = None, per_domain: int = DEFAULT_PER_DOMAIN, domain: str = None,
+                    force: bool = False):
+    if not os.path.exists(FILE_PATH):
+        raise HTTPException(status_code=404, detail="Excel file not found. Please upload the file first.")
+
+    links = await run_in_threadpool(read_application_links, domain)
+    if not links:
+        return {"status": "No links found in the Excel file."}
+
+    max_concurrency = max(1, max_concurrency or browser_pool.capacity)
+    job = BatchJob(links, max_concurrency=max_concurrency, per_domain=max(1, per_domain))
+    # Links that completed in an earlier run are skipped; force starts every link from scratch
+    if force:
+        await run_in_threadpool(link_state.reset_links, links)
+        completed = set()
+    else:
+        completed = await run_in_threadpool(link_state.completed_links, links)
+    for entry in job.links:
+        if entry["link"] in completed:
+            entry["status"] = "skipped"
+
+    JOBS[job.id] = job
+    job.task = asyncio.create_task(run_batch(job))
+
+    return {"status": "Batch run started", "job_id": job.id, "total_links": len(links), "skipped": len(completed)}
+
+
+# =======================
+# Batch Status Endpoints
+# =======================
+@router.get("/run-status/")
+def list_runs():
+    return [job.to_dict(include_links=False) for job in JOBS.values()]
+
+
+@router.get("/run-status/{job_id}")
+def run_status(job_id: str, include_links: bool = True):
+    job = JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Batch job not found.")
+    return job.to_dict(include_links=include_links)
+
+
+# =======================
+# Link State Endpoints
+# =======================
+@router.get("/link-state/")
+def get_link_state(link: str = None):
+    if link:
+        return {"link": link, "stages": link_state.get(link)}
+    return link_state.summary()
+
+
+@router.delete("/link-state/")
+def reset_link_state(link: str = None):
+    link_state.reset(link)
+    return {"status": "Link state reset", "link": link}
@@ -0,0 +1,72 @@
+# bench_apply_candidates.py
+#
+# Compares the batched Apply-button scorer against the per-element path on
+# synthetic pages with a growing number of links.
+#
+#   python benchmarks/bench_apply_candidates.py --sizes 50 200 800
+
+import argparse
+import asyncio
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playwright.async_api import async_playwright
+from website_access import get_best_apply_candidate, get_best_apply_candidate_per_element
+
+PATTERN = re.compile(r"(apply|submit resume|start application)", re.IGNORECASE)
+
+
+def build_page(n_links: int) -> str:
+    rows = []
+    for i in range(n_links):
+        if i % 10 == 0:
+            rows.append(f'<a href="#job-{i}">Learn more about applying #{i}</a>')
+        elif i % 7 == 0:
+            rows.append(f'<button style="width:30px;height:10px">Apply {i}</button>')
+        else:
+            rows.append(f'<a href="#job-{i}">Apply for role {i}</a>')
+    rows.append('<button style="width:160px;height:40px">Apply now</button>')
+    return "<html><body>" + "<br>".join(rows) + "</body></html>"
+
+
+async def time_path(page, fn, repeat: int):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _, score = await fn(page, PATTERN)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, score
+
+
+async def main(sizes, repeat):
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+        print(f"{'links':>8} {'per-element (s)':>16} {'batched (s)':>12} {'speedup':>8}")
+        for n in sizes:
+            await page.set_content(build_page(n))
+            # The per-element path prints per candidate; keep the table readable.
+            devnull = open(os.devnull, "w")
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                slow, slow_score = await time_path(page, get_best_apply_candidate_per_element, repeat)
+                fast, fast_score = await time_path(page, get_best_apply_candidate, repeat)
+            finally:
+                sys.stdout = stdout
+                devnull.close()
+            assert slow_score == fast_score, f"score mismatch: {slow_score} != {fast_score}"
+            print(f"{n:>8} {slow:>16.3f} {fast:>12.3f} {slow / fast:>7.1f}x")
+        await browser.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 800])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.repeat))
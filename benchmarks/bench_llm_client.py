@@ -0,0 +1,75 @@
+# bench_llm_client.py
+#
+# Measures throughput and latency of the LLM dispatcher against the local
+# stub server (started in-process), at several concurrency limits.
+#
+#   python benchmarks/bench_llm_client.py --requests 200 --concurrency 1 8 32
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn
+from llm_stub import app as stub_app
+from llm_client import LLMDispatcher
+
+PORT = int(os.getenv("STUB_PORT", "8001"))
+
+
+def start_stub():
+    server = uvicorn.Server(uvicorn.Config(stub_app, host="127.0.0.1", port=PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def run_level(concurrency: int, requests: int, rpm: float) -> dict:
+    dispatcher = LLMDispatcher(model="stub", max_concurrency=concurrency, requests_per_minute=rpm,
+                               base_url=f"http://127.0.0.1:{PORT}/v1", api_key="stub")
+    latencies = []
+
+    async def one(i):
+        start = time.perf_counter()
+        await dispatcher.chat_json(f"Resume number {i}: Jane Doe, Python engineer, 2019-2024")
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(one(i) for i in range(requests)))
+    finally:
+        await dispatcher.close()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "elapsed": elapsed,
+        "throughput": requests / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "retries": dispatcher.counters["retries"],
+    }
+
+
+def main(args):
+    server = start_stub()
+    try:
+        print(f"{'concurrency':>11} {'req/s':>8} {'p50 (s)':>8} {'p95 (s)':>8} {'retries':>8}")
+        for concurrency in args.concurrency:
+            r = asyncio.run(run_level(concurrency, args.requests, args.rpm))
+            print(f"{concurrency:>11} {r['throughput']:>8.1f} {r['p50']:>8.3f} {r['p95']:>8.3f} {r['retries']:>8}")
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--rpm", type=float, default=100000, help="requests-per-minute limit of the dispatcher")
+    main(parser.parse_args())
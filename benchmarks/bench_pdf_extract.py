@@ -0,0 +1,63 @@
+# bench_pdf_extract.py
+#
+# Times the PDF text extraction modes against the original "dict" walk on
+# synthetic multi-page documents.
+#
+#   python benchmarks/bench_pdf_extract.py --pages 2 20 200
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+from pdf_text import iter_pdf_text
+
+MODES = ["dict", "fast", "layout", "parallel"]
+
+
+def build_pdf(path: str, pages: int, lines_per_page: int = 50):
+    doc = fitz.open()
+    for p in range(pages):
+        page = doc.new_page()
+        for i in range(lines_per_page):
+            y = 40 + i * 14
+            x = 40 if i % 2 == 0 else 320  # two columns to give layout mode some work
+            page.insert_text((x, y), f"Page {p} line {i}: Senior engineer, Python, FastAPI, 2019-2024", fontsize=8)
+    doc.save(path)
+    doc.close()
+
+
+def run_mode(path: str, mode: str):
+    tracemalloc.start()
+    start = time.perf_counter()
+    chars = sum(len(text) for text in iter_pdf_text(path, mode=mode))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, chars
+
+
+def main(page_counts, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'pages':>6} {'mode':>9} {'seconds':>9} {'vs dict':>8} {'peak KiB':>9} {'chars':>9}")
+        for pages in page_counts:
+            path = os.path.join(tmp, f"synthetic_{pages}.pdf")
+            build_pdf(path, pages)
+            baseline = None
+            for mode in MODES:
+                elapsed, peak, chars = min((run_mode(path, mode) for _ in range(repeat)), key=lambda r: r[0])
+                baseline = baseline or elapsed
+                print(f"{pages:>6} {mode:>9} {elapsed:>9.3f} {baseline / elapsed:>7.1f}x {peak // 1024:>9} {chars:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, nargs="+", default=[2, 20, 200])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    main(args.pages, args.repeat)
@@ -0,0 +1,67 @@
+# llm_stub.py
+#
+# Minimal OpenAI-compatible chat completions server for offline testing.
+# Returns a small structured resume after a configurable delay and can
+# inject 429/500 errors to exercise retries.
+#
+#   STUB_LATENCY_MS=800 STUB_ERROR_RATE=0.05 python benchmarks/llm_stub.py
+#   OPENAI_BASE_URL=http://127.0.0.1:8001/v1 uvicorn main:app
+
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "500"))
+JITTER_MS = float(os.getenv("STUB_JITTER_MS", "100"))
+ERROR_RATE = float(os.getenv("STUB_ERROR_RATE", "0"))
+
+app = FastAPI(title="LLM stub")
+stats = {"requests": 0, "errors": 0, "in_flight": 0, "max_in_flight": 0}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    stats["requests"] += 1
+    stats["in_flight"] += 1
+    stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+    try:
+        await asyncio.sleep(max(0.0, LATENCY_MS + random.uniform(-JITTER_MS, JITTER_MS)) / 1000)
+
+        if random.random() < ERROR_RATE:
+            stats["errors"] += 1
+            status = random.choice([429, 500])
+            return JSONResponse(status_code=status, content={"error": {"message": "stub error", "type": "stub"}})
+
+        prompt = body["messages"][-1]["content"]
+        content = {"name": "Stub Candidate", "summary": prompt[:200], "prompt_chars": len(prompt)}
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": json.dumps(content)},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 20, "total_tokens": len(prompt) // 4 + 20},
+        }
+    finally:
+        stats["in_flight"] -= 1
+
+
+@app.get("/stats")
+def get_stats():
+    return stats
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="127.0.0.1", port=int(os.getenv("STUB_PORT", "8001")), log_level="warning")
@@ -0,0 +1,199 @@
+# run_bench.py
+#
+# Offline benchmark for the open_page_and_capture pipeline. Serves the HTML
+# fixtures in benchmarks/fixtures from a local HTTP server, runs every fixture
+# through the pipeline at several concurrency levels, and reports per-stage
+# timings (from the metrics spans) and throughput.
+#
+#   python benchmarks/run_bench.py                     # compare against baseline.json
+#   python benchmarks/run_bench.py --require-baseline  # same, but a missing baseline fails (CI)
+#   python benchmarks/run_bench.py --update-baseline   # record a new baseline
+#
+# The run fails (exit code 1) when a fixture produces the wrong outcome or
+# skips a stage it exists to exercise, or a stage/throughput figure regresses
+# beyond --tolerance against the baseline. Baselines are machine specific;
+# record one on the host that runs the check.
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import metrics
+from browser_pool import BrowserPool
+from website_access import open_page_and_capture
+
+FIXTURES_DIR = os.path.join(ROOT, "benchmarks", "fixtures")
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+# Expected pipeline outcome per fixture, and stages its trace must contain
+FIXTURES = {
+    "ats_apply_button.html": {"outcome": "applied"},
+    "cookie_banner.html": {"outcome": "applied"},
+    "lazy_apply.html": {"outcome": "applied", "stages": ["lazy_scroll"]},
+    "iframe_form.html": {"outcome": "form"},
+    "huge_link_list.html": {"outcome": "applied"},
+    "long_canvas_page.html": {"outcome": "applied", "text_source": "ocr"},
+}
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def start_fixture_server():
+    handler = functools.partial(QuietHandler, directory=FIXTURES_DIR)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_address[1]
+
+
+def fixture_url(port: int, name: str, concurrency: int, run: int) -> str:
+    """
+    Gives every run of every fixture its own host. The selector cache and
+    consent store are keyed by host, so with a shared 127.0.0.1 one fixture's
+    cached selector would be tried (and time out) on the next, and timings
+    would depend on fixture order. Chromium resolves *.localhost to loopback.
+    """
+    slug = os.path.splitext(name)[0].replace("_", "-")
+    return f"http://{slug}-c{concurrency}-r{run}.localhost:{port}/{name}"
+
+
+def outcome_of(result: dict) -> str:
+    return "applied" if result["apply_clicked"] else "form" if result["form_detected"] else "no_apply"
+
+
+async def run_level(port: int, concurrency: int, repeat: int) -> dict:
+    metrics.registry.reset()
+    pool = BrowserPool(size=max(1, concurrency // 4), contexts_per_browser=min(concurrency, 4), headless=True)
+    await pool.start()
+    slots = asyncio.Semaphore(concurrency)
+    failures = []
+
+    async def run_one(name: str, run: int):
+        async with slots:
+            try:
+                result = await open_page_and_capture(fixture_url(port, name, concurrency, run), pool=pool)
+            except Exception as e:
+                failures.append(f"{name}: {type(e).__name__}: {e}")
+                return
+            expected = FIXTURES[name]
+            if outcome_of(result) != expected["outcome"]:
+                failures.append(f"{name}: expected {expected['outcome']}, got {outcome_of(result)}")
+            if "text_source" in expected and result["text_source"] != expected["text_source"]:
+                failures.append(f"{name}: expected text from {expected['text_source']}, got {result['text_source']}")
+            trace = metrics.get_trace(result["trace_id"]) or {"spans": []}
+            recorded = {span["stage"] for span in trace["spans"]}
+            for stage in expected.get("stages", []):
+                if stage not in recorded:
+                    failures.append(f"{name}: no {stage} span recorded")
+
+    links = [(name, run) for name in FIXTURES for run in range(repeat)]
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(run_one(name, run) for name, run in links))
+    finally:
+        await pool.stop()
+    elapsed = time.perf_counter() - start
+
+    stages = {}
+    for key, hist in metrics.registry.snapshot().items():
+        stage = key.split("/")[0]
+        entry = stages.setdefault(stage, {"count": 0, "sum": 0.0})
+        entry["count"] += hist["count"]
+        entry["sum"] += hist["sum"]
+    stage_means = {stage: round(v["sum"] / v["count"], 4) for stage, v in stages.items() if v["count"]}
+
+    return {
+        "concurrency": concurrency,
+        "pages": len(links),
+        "elapsed": round(elapsed, 3),
+        "pages_per_second": round(len(links) / elapsed, 3),
+        "stage_mean_seconds": stage_means,
+        "failures": failures,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for level, current in results.items():
+        previous = baseline.get(level)
+        if not previous:
+            continue
+        if current["pages_per_second"] < previous["pages_per_second"] * (1 - tolerance):
+            regressions.append(f"c={level}: throughput {current['pages_per_second']} < {previous['pages_per_second']}")
+        for stage, mean in current["stage_mean_seconds"].items():
+            before = previous["stage_mean_seconds"].get(stage)
+            # Ignore sub-50ms stages: their noise is larger than any real change
+            if before and mean > 0.05 and mean > before * (1 + tolerance):
+                regressions.append(f"c={level}: {stage} mean {mean}s > {before}s")
+    return regressions
+
+
+async def main(args):
+    server, port = start_fixture_server()
+    # Run inside a scratch directory so cache files, state and screenshots from
+    # earlier benchmark runs are not reused; fixture_url keeps runs apart within one
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    results = {}
+    try:
+        for concurrency in args.concurrency:
+            level = await run_level(port, concurrency, args.repeat)
+            results[str(concurrency)] = level
+            print(f"c={concurrency:<3} {level['pages']} pages in {level['elapsed']}s "
+                  f"({level['pages_per_second']} pages/s)")
+            for stage, mean in sorted(level["stage_mean_seconds"].items()):
+                print(f"    {stage:<20} {mean:.4f}s")
+            for failure in level["failures"]:
+                print(f"    ❌ {failure}")
+    finally:
+        os.chdir(cwd)
+        server.shutdown()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    failed = any(level["failures"] for level in results.values())
+
+    if args.update_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"📌 Baseline written to {BASELINE_PATH}")
+    elif os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"📉 Regression: {regression}")
+        failed = failed or bool(regressions)
+    elif args.require_baseline:
+        print(f"❌ No baseline at {BASELINE_PATH}; run with --update-baseline to create one.")
+        failed = True
+    else:
+        print("ℹ️ No baseline recorded yet; run with --update-baseline to create one.")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--repeat", type=int, default=2, help="times each fixture is run per level")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs. baseline (0.25 = 25%%)")
+    parser.add_argument("--output", help="also write the results as JSON to this path")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--require-baseline", action="store_true",
+                        help="fail instead of skipping the regression check when no baseline is recorded")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,173 @@
+# browser_pool.py
+
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from config import env_flag
+from metrics import lazy_import
+
+
+DEFAULT_CONTEXT_OPTIONS = {
+    "viewport": {"width": 1280, "height": 800},
+    "device_scale_factor": 1,
+}
+
+
+class _PooledBrowser:
+    def __init__(self, browser):
+        self.browser = browser
+        self.active = 0
+        self.pages_served = 0
+        self.retiring = False
+
+    @property
+    def healthy(self) -> bool:
+        return self.browser.is_connected()
+
+
+class BrowserPool:
+    """
+    Long-lived Chromium browsers handing out isolated contexts.
+
+    Every lease gets a fresh context (no shared cookies or storage) on the
+    least loaded browser. A browser is retired after `max_pages_per_browser`
+    leases and closed once its last lease is returned; disconnected browsers
+    are replaced on the next lease.
+    """
+
+    def __init__(self, size: int = 2, contexts_per_browser: int = 4,
+                 max_pages_per_browser: int = 50, headless: bool = True):
+        self.size = max(1, size)
+        self.contexts_per_browser = max(1, contexts_per_browser)
+        self.max_pages_per_browser = max(1, max_pages_per_browser)
+        self.headless = headless
+
+        self._playwright = None
+        self._browsers = []
+        self._slots = None
+        self._lock = None
+        self._start_lock = None
+
+    @classmethod
+    def from_env(cls, **overrides):
+        settings = {
+            "size": int(os.getenv("BROWSER_POOL_SIZE", "2")),
+            "contexts_per_browser": int(os.getenv("BROWSER_CONTEXTS_PER_BROWSER", "4")),
+            "max_pages_per_browser": int(os.getenv("BROWSER_MAX_PAGES", "50")),
+            "headless": env_flag("BROWSER_HEADLESS", True),
+        }
+        return cls(**{**settings, **overrides})
+
+    @property
+    def started(self) -> bool:
+        return self._playwright is not None
+
+    @property
+    def capacity(self) -> int:
+        return self.size * self.contexts_per_browser
+
+    async def start(self):
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        # Leases start the pool on demand, so concurrent first leases must not start it twice
+        async with self._start_lock:
+            if self.started:
+                return
+            self._lock = asyncio.Lock()
+            self._slots = asyncio.Semaphore(self.capacity)
+            async_playwright = lazy_import("playwright.async_api").async_playwright
+            self._playwright = await async_playwright().start()
+            for _ in range(self.size):
+                self._browsers.append(await self._launch())
+            print(f"🚀 Browser pool started ({self.size} browsers, headless={self.headless})")
+
+    async def stop(self):
+        if not self.started:
+            return
+        for entry in self._browsers:
+            await self._close(entry)
+        self._browsers = []
+        await self._playwright.stop()
+        self._playwright = None
+        print("🛑 Browser pool stopped")
+
+    async def _launch(self) -> _PooledBrowser:
+        browser = await self._playwright.chromium.launch(headless=self.headless)
+        return _PooledBrowser(browser)
+
+    async def _close(self, entry: _PooledBrowser):
+        try:
+            await entry.browser.close()
+        except Exception as e:
+            print(f"⚠️ Failed to close pooled browser: {e}")
+
+    async def _acquire_browser(self) -> _PooledBrowser:
+        async with self._lock:
+            # Health check: drop browsers that crashed or disconnected
+            for entry in [b for b in self._browsers if not b.healthy]:
+                print("⚠️ Pooled browser disconnected, replacing it")
+                self._browsers.remove(entry)
+
+            serving = [b for b in self._browsers if not b.retiring]
+            while len(serving) < self.size:
+                entry = await self._launch()
+                self._browsers.append(entry)
+                serving.append(entry)
+
+            entry = min(serving, key=lambda b: b.active)
+            entry.active += 1
+            entry.pages_served += 1
+            if entry.pages_served >= self.max_pages_per_browser:
+                entry.retiring = True
+            return entry
+
+    async def _release(self, entry: _PooledBrowser):
+        async with self._lock:
+            entry.active -= 1
+            if entry.retiring and entry.active == 0 and entry in self._browsers:
+                self._browsers.remove(entry)
+                await self._close(entry)
+                print("♻️ Recycled pooled browser")
+
+    @asynccontextmanager
+    async def lease(self, **context_options):
+        """
+        Yields a page in a fresh, isolated context. Extra keyword arguments
+        are passed on to `browser.new_context`.
+        """
+        if not self.started:
+            await self.start()
+
+        async with self._slots:
+            entry = await self._acquire_browser()
+            context = None
+            try:
+                context = await entry.browser.new_context(**{**DEFAULT_CONTEXT_OPTIONS, **context_options})
+                page = await context.new_page()
+                yield page
+            finally:
+                if context is not None:
+                    try:
+                        await context.close()
+                    except Exception:
+                        pass
+                await self._release(entry)
+
+    def stats(self) -> dict:
+        return {
+            "started": self.started,
+            "capacity": self.capacity,
+            "browsers": [
+                {
+                    "connected": entry.healthy,
+                    "active_pages": entry.active,
+                    "pages_served": entry.pages_served,
+                    "retiring": entry.retiring,
+                }
+                for entry in self._browsers
+            ],
+        }
+
+
+# Shared pool owned by the FastAPI app (see main.py startup/shutdown hooks)
+pool = BrowserPool.from_env()
@@ -0,0 +1,13 @@
+# config.py
+#
+# Helpers for reading settings from the environment, shared by modules that
+# should not depend on each other just to parse a flag.
+
+import os
+
+
+def env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
@@ -0,0 +1,58 @@
+# consent_store.py
+#
+# Per-domain Playwright storage state (cookies + localStorage). Once a
+# cookie banner has been answered on a domain, later contexts for that
+# domain start with the consent already given and skip the banner search.
+
+import os
+import re
+import tempfile
+import time
+
+
+STATE_DIR = "data/storage_state"
+
+
+class ConsentStore:
+    def __init__(self, directory: str = STATE_DIR, ttl_seconds: float = 30 * 24 * 3600):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+
+    def _path(self, domain: str) -> str:
+        safe = re.sub(r"[^a-z0-9.-]", "_", (domain or "unknown").lower())
+        return os.path.join(self.directory, f"{safe}.json")
+
+    def state_path(self, domain: str):
+        """Returns the stored state file for the domain, or None if there is none (or it expired)."""
+        path = self._path(domain)
+        try:
+            age = time.time() - os.path.getmtime(path)
+        except OSError:
+            return None
+        return path if age < self.ttl_seconds else None
+
+    async def save(self, context, domain: str):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".state-", suffix=".json")
+        os.close(fd)
+        try:
+            await context.storage_state(path=tmp_path)
+            os.replace(tmp_path, self._path(domain))
+            print(f"🍪 Stored consent state for {domain}")
+        except Exception as e:
+            print(f"⚠️ Could not store consent state for {domain}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def forget(self, domain: str):
+        path = self._path(domain)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def domains(self) -> list:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-5] for name in os.listdir(self.directory) if name.endswith(".json"))
+
+
+consent_store = ConsentStore(ttl_seconds=float(os.getenv("CONSENT_TTL_DAYS", "30")) * 24 * 3600)
@@ -1,43 +1,46 @@
 # Dataexcel.py
 
 from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi.concurrency import run_in_threadpool
 import os
-import shutil
-import pandas as pd  # For reading Excel files
 import webbrowser  # For opening links in the web browser
+from uploads import save_upload, remove_with_hash, ensure_hash
+from link_store import link_store
 
 
 router = APIRouter()
 FILE_PATH = "data/job_links.xlsx"  # Constant for the Excel file path
+MAX_EXCEL_BYTES = int(os.getenv("MAX_EXCEL_BYTES", str(50 * 1024 * 1024)))
 
 
 # =======================
 # Upload Excel File Endpoint
 # =======================
 @router.post("/upload-excel/")
-async def upload_excel(file: UploadFile = File(...)):
+async def upload_excel(file: UploadFile = File(...), overwrite: bool = False):
     try:
-        os.makedirs("data", exist_ok=True)
+        saved = await save_upload(file, FILE_PATH, MAX_EXCEL_BYTES, extensions=(".xlsx",), magic=b"PK\x03\x04",
+                                  overwrite=overwrite)
 
-        if os.path.exists(FILE_PATH):  # Check if file already exists
-            print("An Excel file already exists.")
-            choice = input("Do you want to (O)verwrite or (C)ancel the upload? [O/C]: ").strip().lower()
+        if saved["status"] == "exists":
+            return {"status": "Upload cancelled",
+                    "message": "An Excel file already exists. Upload again with overwrite=true to replace it."}
 
-            if choice == 'c':  # Cancel
-                return {"status": "Upload cancelled", "message": "File upload was not performed."}
-            elif choice == 'o':  # Overwrite
-                with open(FILE_PATH, "wb") as f:
-                    shutil.copyfileobj(file.file, f)
-                return {"status": "Excel file overwritten successfully", "filename": file.filename}
-            else:
-                return {"status": "Invalid choice. Operation aborted."}
+        # Parse the sheet once, here, into the link index
+        if saved["status"] == "unchanged" and link_store.source_hash() == saved["sha256"]:
+            return {"status": "Excel file unchanged", "filename": file.filename, "total_links": link_store.count()}
+        try:
+            summary = await run_in_threadpool(link_store.rebuild_from_xlsx, FILE_PATH, saved["sha256"])
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-        # If the file doesn't exist, simply save it
-        with open(FILE_PATH, "wb") as f:
-            shutil.copyfileobj(file.file, f)
+        if saved["status"] == "replaced":
+            return {"status": "Excel file overwritten successfully", "filename": file.filename, **summary}
 
-        return {"status": "Excel file uploaded successfully", "filename": file.filename}
+        return {"status": "Excel file uploaded successfully", "filename": file.filename, **summary}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred while uploading the Excel file: {str(e)}")
 
@@ -56,13 +59,62 @@ def delete_excel():
         if confirmation.lower() != 'yes':
             return {"status": "File deletion cancelled"}
 
-        os.remove(FILE_PATH)  # Delete the file
+        remove_with_hash(FILE_PATH)  # Delete the file and its content hash
+        link_store.clear()
         return {"status": "Excel file deleted successfully"}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred while deleting the Excel file: {str(e)}")
 
 
+# =======================
+# Read Links From The Link Index
+# =======================
+def ensure_link_index():
+    """
+    Rebuilds the link index if it was built from a different (or no) upload.
+    """
+    # A sheet saved without a .sha256 sidecar is hashed once here, not rebuilt on every read
+    sha256 = ensure_hash(FILE_PATH)
+    if sha256 is None or link_store.source_hash() != sha256:
+        try:
+            link_store.rebuild_from_xlsx(FILE_PATH, sha256)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+
+def read_application_links(domain: str = None) -> list:
+    """
+    Returns every normalized, de-duplicated application link, optionally for one domain.
+    """
+    ensure_link_index()
+    return link_store.all_urls(domain=domain)
+
+
+@router.get("/links/")
+def list_links(offset: int = 0, limit: int = 100, domain: str = None):
+    if not os.path.exists(FILE_PATH):
+        raise HTTPException(status_code=404, detail="Excel file not found. Please upload the file first.")
+
+    ensure_link_index()
+    limit = max(1, min(limit, 1000))
+    return {
+        "total": link_store.count(domain=domain),
+        "offset": offset,
+        "limit": limit,
+        "links": link_store.list_links(offset=offset, limit=limit, domain=domain),
+    }
+
+
+@router.get("/links/domains/")
+def list_link_domains():
+    if not os.path.exists(FILE_PATH):
+        raise HTTPException(status_code=404, detail="Excel file not found. Please upload the file first.")
+
+    ensure_link_index()
+    return link_store.domains()
+
+
 # =======================
 # Read & Open Links From Excel
 # =======================
@@ -72,14 +124,7 @@ def open_links():
         if not os.path.exists(FILE_PATH):
             raise HTTPException(status_code=404, detail="Excel file not found. Please upload the file first.")
 
-        # Read the Excel file
-        df = pd.read_excel(FILE_PATH)
-
-        if "Application link" not in df.columns:
-            raise HTTPException(status_code=400,
-                                detail="The Excel file does not contain a column named 'Application link'.")
-
-        links = df["Application link"].dropna().tolist()  # Get all non-empty links
+        links = read_application_links()
 
         if not links:
             return {"status": "No links found in the Excel file."}
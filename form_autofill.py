@@ -0,0 +1,317 @@
+# form_autofill.py
+#
+# Fills application forms from data/user_profile.json and
+# data/structured_resume.json. Field descriptors (label, placeholder, name,
+# aria-label, id) are matched in Python against a prebuilt index, and each
+# frame is read and filled with one evaluate apiece; only file inputs need a
+# separate set_input_files call. Forms are never submitted.
+
+import asyncio
+import json
+import os
+import re
+import time
+
+from config import env_flag
+from metrics import span
+
+
+PROFILE_PATH = "data/user_profile.json"
+STRUCTURED_RESUME_PATH = "data/structured_resume.json"
+RESUME_PDF_PATH = "data/resume.pdf"
+AUTOFILL_ENABLED = env_flag("AUTOFILL_ENABLED", True)
+
+FIELD_ATTR = "data-autofill-field"
+
+# Canonical value -> phrases that identify a field asking for it. Phrases in
+# EXACT_FIELD_PHRASES only match a whole descriptor, everything else matches
+# as a phrase inside the label/placeholder/name/aria text.
+FIELD_PHRASES = {
+    "first_name": ["first name", "firstname", "given name", "fname", "forename"],
+    "last_name": ["last name", "lastname", "surname", "family name", "lname"],
+    "full_name": ["full name", "your name", "legal name", "candidate name"],
+    "email": ["email", "e mail", "email address"],
+    "phone": ["phone", "mobile", "telephone", "phone number", "cell"],
+    "linkedin": ["linkedin", "linked in", "linkedin profile", "linkedin url"],
+    "github": ["github", "git hub"],
+    "website": ["website", "portfolio", "personal site", "personal website"],
+    "location": ["location", "city", "current location", "address"],
+    "veteran_status": ["veteran", "veteran status", "protected veteran"],
+    "disability_status": ["disability", "disability status"],
+    "resume": ["resume", "cv", "curriculum vitae"],
+}
+EXACT_FIELD_PHRASES = {"name": "full_name"}
+# Fields that ask about someone else ("Hiring manager email", "Emergency
+# contact phone") or a second line of something already filled. A descriptor
+# containing one of these is never matched, so it is reported as unmatched.
+NEGATIVE_FIELD_PHRASES = ["manager", "reference", "emergency", "referrer", "referred by", "recruiter",
+                          "supervisor", "line 2", "line2", "address 2", "address2"]
+
+# Resume JSON has no fixed schema (the LLM picks the keys), so contact keys are
+# matched by name, normalised like field descriptors. Only top-level keys and
+# those of a top-level section (e.g. "contact") count; entries in lists such
+# as work history carry their own location, email, etc. and are never used.
+RESUME_KEYS = {
+    "full_name": ["name", "full name"],
+    "email": ["email", "email address"],
+    "phone": ["phone", "phone number", "mobile"],
+    "linkedin": ["linkedin", "linked in", "linkedin url"],
+    "github": ["github", "git hub", "github url"],
+    "website": ["website", "portfolio", "personal website"],
+    "location": ["location", "city", "address"],
+}
+
+SKIPPED_INPUT_TYPES = ("hidden", "submit", "button", "reset", "image", "checkbox", "radio", "password")
+
+# Stamps every fillable field and returns what is needed to match it
+COLLECT_FILLABLE_JS = """
+([attr, skippedTypes]) => {
+    const textOf = id => {
+        const el = id && document.getElementById(id);
+        return el ? (el.innerText || el.textContent || "") : "";
+    };
+    const fields = [];
+    document.querySelectorAll("input, textarea, select").forEach(el => {
+        const type = (el.getAttribute("type") || el.tagName).toLowerCase();
+        if (skippedTypes.includes(type) || el.disabled || el.readOnly) return;
+
+        // A <label> wrapping a <select> would otherwise carry the text of every option
+        const labelText = l => {
+            const copy = l.cloneNode(true);
+            copy.querySelectorAll("select, option, datalist").forEach(child => child.remove());
+            return copy.textContent || "";
+        };
+        let label = Array.from(el.labels || []).map(labelText).join(" ");
+        const labelledBy = el.getAttribute("aria-labelledby");
+        if (labelledBy) label += " " + labelledBy.split(/\\s+/).map(textOf).join(" ");
+
+        const index = fields.length;
+        el.setAttribute(attr, String(index));
+        fields.push({
+            index,
+            tag: el.tagName.toLowerCase(),
+            type,
+            label: label.trim(),
+            placeholder: el.getAttribute("placeholder") || "",
+            ariaLabel: el.getAttribute("aria-label") || "",
+            name: el.getAttribute("name") || "",
+            id: el.id || "",
+            hasValue: type === "file" ? el.files.length > 0 : !!el.value,
+        });
+    });
+    return fields;
+}
+"""
+
+# Sets all values in one pass. The native value setter is used so frameworks
+# that track input state (React, Vue) see the change, then input/change fire.
+FILL_FIELDS_JS = """
+([attr, fills]) => {
+    const filled = [];
+    for (const {index, value} of fills) {
+        const el = document.querySelector(`[${attr}="${index}"]`);
+        if (!el) continue;
+        if (el.tagName === "SELECT") {
+            const wanted = value.toLowerCase();
+            const option = Array.from(el.options).find(o =>
+                o.value.toLowerCase() === wanted || o.text.trim().toLowerCase() === wanted)
+                || Array.from(el.options).find(o => o.text.toLowerCase().includes(wanted));
+            if (!option) continue;
+            el.value = option.value;
+        } else {
+            const proto = el.tagName === "TEXTAREA" ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+            Object.getOwnPropertyDescriptor(proto, "value").set.call(el, value);
+        }
+        el.dispatchEvent(new Event("input", {bubbles: true}));
+        el.dispatchEvent(new Event("change", {bubbles: true}));
+        filled.push(index);
+    }
+    return filled;
+}
+"""
+
+
+def _normalize(text: str) -> str:
+    # "first_name", "firstName" and "First Name*" all become "first name";
+    # camelCase is only split in identifiers so "LinkedIn URL" stays "linkedin url"
+    text = text or ""
+    if " " not in text.strip():
+        text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text)
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text.lower()).split())
+
+
+class FieldIndex:
+    """
+    Maps normalised field descriptors to canonical value keys. Phrases are
+    compiled once, longest first, so "first name" wins over "name".
+    """
+
+    def __init__(self, phrases: dict = FIELD_PHRASES, exact: dict = EXACT_FIELD_PHRASES,
+                 negative: list = NEGATIVE_FIELD_PHRASES):
+        self.exact = dict(exact)
+        for key, key_phrases in phrases.items():
+            for phrase in key_phrases:
+                self.exact.setdefault(_normalize(phrase), key)
+        ordered = sorted(((phrase, key) for key, key_phrases in phrases.items() for phrase in key_phrases),
+                         key=lambda item: len(item[0]), reverse=True)
+        self.patterns = [(re.compile(rf"\b{re.escape(_normalize(phrase))}\b"), key) for phrase, key in ordered]
+        self.negative = re.compile(r"\b(" + "|".join(re.escape(_normalize(phrase)) for phrase in negative) + r")\b")
+
+    def match(self, field: dict):
+        # The most specific descriptors come first: a visible label beats a generated name
+        descriptors = [_normalize(field.get(name, "")) for name in ("label", "ariaLabel", "placeholder", "name", "id")]
+        descriptors = [text for text in descriptors if text]
+        if any(self.negative.search(text) for text in descriptors):
+            return None
+        for text in descriptors:
+            if text in self.exact:
+                return self.exact[text]
+        for text in descriptors:
+            for pattern, key in self.patterns:
+                if pattern.search(text):
+                    return key
+        return None
+
+
+def _is_scalar(value) -> bool:
+    return isinstance(value, (str, int, float)) and bool(str(value).strip())
+
+
+def _contact_leaves(resume: dict) -> dict:
+    """
+    Normalised key -> value for top-level scalars and the scalars of top-level
+    sections. Lists are skipped, so job and education entries never match.
+    """
+    leaves, nested = {}, {}
+    for key, value in resume.items():
+        if _is_scalar(value):
+            leaves.setdefault(_normalize(str(key)), str(value).strip())
+        elif isinstance(value, dict):
+            for child_key, child in value.items():
+                if _is_scalar(child):
+                    nested.setdefault(_normalize(str(child_key)), str(child).strip())
+    # A top-level "name" wins over one inside a section
+    for key, value in nested.items():
+        leaves.setdefault(key, value)
+    return leaves
+
+
+def build_values(profile: dict, resume: dict) -> dict:
+    """
+    Canonical key -> value, profile first, then whatever the structured resume adds.
+    """
+    values = {}
+    leaves = _contact_leaves(resume if isinstance(resume, dict) else {})
+    for key, names in RESUME_KEYS.items():
+        for name in names:
+            if name in leaves:
+                values[key] = leaves[name]
+                break
+
+    for key in ("email", "phone", "veteran_status", "disability_status"):
+        if (profile or {}).get(key):
+            values[key] = profile[key]
+    if (profile or {}).get("name"):
+        values["full_name"] = profile["name"]
+
+    if "full_name" in values:
+        parts = values["full_name"].split()
+        values.setdefault("first_name", parts[0])
+        if len(parts) > 1:
+            values.setdefault("last_name", parts[-1])
+    return values
+
+
+_cache = {"stamp": None, "values": {}}
+_index = FieldIndex()
+
+
+def _read_json(path: str) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def load_values() -> dict:
+    """
+    Returns the fill values, re-reading the JSON files only when they change.
+    """
+    stamp = tuple(os.path.getmtime(path) if os.path.exists(path) else None
+                  for path in (PROFILE_PATH, STRUCTURED_RESUME_PATH))
+    if stamp != _cache["stamp"]:
+        _cache["values"] = build_values(_read_json(PROFILE_PATH), _read_json(STRUCTURED_RESUME_PATH))
+        _cache["stamp"] = stamp
+    return _cache["values"]
+
+
+async def autofill_frame(frame, values: dict, resume_pdf: str = None) -> dict:
+    start = time.perf_counter()
+    report = {"frame": frame.url, "fields": 0, "matched": 0, "filled": 0, "files": 0, "unmatched": []}
+    try:
+        fields = await frame.evaluate(COLLECT_FILLABLE_JS, [FIELD_ATTR, list(SKIPPED_INPUT_TYPES)])
+    except Exception as e:
+        print(f"⚠️ Could not read fields from frame ({frame.url}): {e}")
+        fields = []
+
+    fills, file_fields = [], []
+    for field in fields:
+        key = _index.match(field)
+        if key is None:
+            report["unmatched"].append(field["label"] or field["placeholder"] or field["name"] or field["id"])
+            continue
+        report["matched"] += 1
+        if field["hasValue"]:
+            continue
+        if field["type"] == "file":
+            if key == "resume" and resume_pdf:
+                file_fields.append(field["index"])
+        elif key in values:
+            fills.append({"index": field["index"], "value": values[key]})
+
+    report["fields"] = len(fields)
+    try:
+        if fills:
+            report["filled"] = len(await frame.evaluate(FILL_FIELDS_JS, [FIELD_ATTR, fills]))
+        for index in file_fields:
+            await frame.locator(f"[{FIELD_ATTR}='{index}']").set_input_files(resume_pdf)
+            report["files"] += 1
+    except Exception as e:
+        print(f"⚠️ Autofill failed in frame ({frame.url}): {e}")
+
+    report["unmatched"] = [text for text in report["unmatched"] if text][:10]
+    report["coverage"] = round((report["filled"] + report["files"]) / len(fields), 3) if fields else None
+    report["elapsed"] = round(time.perf_counter() - start, 3)
+    return report
+
+
+async def autofill_page(page) -> dict:
+    """
+    Fills every frame of the page that has form fields and returns a report
+    with per-frame and overall coverage (filled fields / fillable fields).
+    """
+    start = time.perf_counter()
+    async with span("autofill") as s:
+        values = await asyncio.to_thread(load_values)
+        resume_pdf = RESUME_PDF_PATH if os.path.exists(RESUME_PDF_PATH) else None
+        if not values and not resume_pdf:
+            s.outcome = "no_data"
+            print("⚠️ No profile or resume data to fill the form with")
+            return {"forms": [], "fields": 0, "filled": 0, "coverage": None, "elapsed": 0.0}
+
+        reports = await asyncio.gather(*(autofill_frame(frame, values, resume_pdf) for frame in page.frames))
+        forms = [report for report in reports if report["fields"]]
+        fields = sum(report["fields"] for report in forms)
+        filled = sum(report["filled"] + report["files"] for report in forms)
+        s.outcome = "filled" if filled else "none"
+
+    summary = {
+        "forms": forms,
+        "fields": fields,
+        "filled": filled,
+        "coverage": round(filled / fields, 3) if fields else None,
+        "elapsed": round(time.perf_counter() - start, 3),
+    }
+    print(f"📝 Autofilled {filled}/{fields} fields in {len(forms)} frames in {summary['elapsed']}s")
+    return summary
@@ -2,8 +2,9 @@
 
 from fastapi import APIRouter, UploadFile, File, HTTPException
 import os
-import shutil
-from parse_resume import parse_resume
+from parse_resume import parse_uploaded_resume, MAX_RESUME_BYTES, SNAPSHOT_DIR
+from resume_jobs import resume_jobs
+from uploads import save_upload, remove_with_hash
 
 router = APIRouter()
 FILE_PATH = "data/resume.pdf"  # Constant for file path
@@ -15,20 +16,35 @@ FILE_PATH = "data/resume.pdf"  # Constant for file path
 @router.post("/upload-resume/")
 async def upload_resume(file: UploadFile = File(...)):
     try:
-        os.makedirs("data", exist_ok=True)
+        saved = await save_upload(file, FILE_PATH, MAX_RESUME_BYTES, extensions=(".pdf",), magic=b"%PDF",
+                                  snapshot_dir=SNAPSHOT_DIR)
 
-        # Always overwrite the file if it exists
-        with open(FILE_PATH, "wb") as f:
-            shutil.copyfileobj(file.file, f)
+        if saved["status"] == "unchanged":
+            # Identical bytes: keep the existing file and structured resume
+            return {"status": "Resume unchanged", "filename": file.filename, "sha256": saved["sha256"]}
 
-        structured = parse_resume()
+        # The job parses its own snapshot, so a later upload cannot swap the file under it
+        job_id = resume_jobs.submit(parse_uploaded_resume, saved["snapshot"], saved["sha256"])
 
-        return {"status": "Resume uploaded successfully", "filename": file.filename}
+        return {"status": "Resume uploaded successfully", "filename": file.filename, "job_id": job_id}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred while uploading the file: {str(e)}")
 
 
+# =======================
+# Parse Status Endpoint
+# =======================
+@router.get("/parse-status/{job_id}")
+def parse_status(job_id: str):
+    job = resume_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Parse job not found.")
+    return job
+
+
 
 # =======================
 # Delete Resume Endpoint
@@ -44,7 +60,7 @@ def delete_resume():
         if confirmation.lower() != 'yes':
             return {"status": "File deletion cancelled"}
 
-        os.remove(FILE_PATH)  # Delete the file
+        remove_with_hash(FILE_PATH)  # Delete the file and its content hash
         return {"status": "File deleted successfully"}
 
     except Exception as e:
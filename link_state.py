@@ -0,0 +1,85 @@
+# link_state.py
+#
+# Per-URL processing state, so batch runs skip links that are already done
+# and pick interrupted links up again at the stage where they stopped.
+
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+from link_store import normalize_url
+
+
+DB_PATH = "data/link_state.db"
+
+# Pipeline stages in the order open_page_and_capture reaches them
+STAGES = ("navigated", "scraped", "completed")
+
+
+class LinkStateStore:
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS stages (
+                url TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                detail TEXT,
+                recorded_at REAL NOT NULL,
+                PRIMARY KEY (url, stage)
+            )
+        """)
+        return conn
+
+    @staticmethod
+    def key(link: str) -> str:
+        return normalize_url(link) or link
+
+    def record(self, link: str, stage: str, **detail):
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage: {stage}")
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO stages (url, stage, detail, recorded_at) VALUES (?, ?, ?, ?)",
+                         (self.key(link), stage, json.dumps(detail), time.time()))
+
+    def get(self, link: str) -> dict:
+        """Returns {stage: {"recorded_at": ..., **detail}} for every stage the link reached."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT stage, detail, recorded_at FROM stages WHERE url = ?", (self.key(link),))
+            return {row["stage"]: {"recorded_at": row["recorded_at"], **json.loads(row["detail"] or "{}")}
+                    for row in rows}
+
+    def completed_links(self, links) -> set:
+        keys = {self.key(link): link for link in links}
+        done = set()
+        with closing(self._connect()) as conn:
+            for row in conn.execute("SELECT url FROM stages WHERE stage = 'completed'"):
+                if row["url"] in keys:
+                    done.add(keys[row["url"]])
+        return done
+
+    def reset_links(self, links):
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("DELETE FROM stages WHERE url = ?", [(self.key(link),) for link in links])
+
+    def reset(self, link: str = None):
+        with closing(self._connect()) as conn, conn:
+            if link:
+                conn.execute("DELETE FROM stages WHERE url = ?", (self.key(link),))
+            else:
+                conn.execute("DELETE FROM stages")
+
+    def summary(self) -> dict:
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT stage, COUNT(*) AS links FROM stages GROUP BY stage")
+            return {row["stage"]: row["links"] for row in rows}
+
+
+link_state = LinkStateStore()
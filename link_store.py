@@ -0,0 +1,176 @@
+# link_store.py
+#
+# Compact SQLite index of the "Application link" column, built once when the
+# spreadsheet is uploaded so reads and batch runs never touch the xlsx again.
+
+import os
+import re
+import sqlite3
+import time
+from contextlib import closing
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from metrics import lazy_import
+
+
+DB_PATH = "data/links.db"
+LINK_COLUMN = "Application link"
+TRACKING_PARAMS = ("utm_", "gh_src")
+# A bare "host.tld[:port][/...]" cell; anything else without a scheme is not a link
+BARE_HOST_RE = re.compile(r"^[a-z0-9-]+(\.[a-z0-9-]+)+(:\d+)?([/?#]|$)", re.IGNORECASE)
+
+
+def normalize_url(raw) -> str:
+    """
+    Returns a canonical form of the link (lowercase scheme and host, no
+    fragment, default port, trailing slash or tracking parameters), or None
+    when the cell does not hold a usable URL.
+    """
+    if raw is None:
+        return None
+    url = str(raw).strip()
+    if not url:
+        return None
+    if "://" not in url:
+        # "Apply via email: jobs@acme.com" or "mailto:a@b.c" must not become https://acme.com/
+        if not BARE_HOST_RE.match(url):
+            return None
+        url = "https://" + url
+
+    try:
+        parts = urlsplit(url)
+        port = parts.port  # raises for "x.com:abc", out-of-range ports and broken IPv6 literals
+    except ValueError:
+        return None
+    if parts.scheme.lower() not in ("http", "https") or not parts.hostname:
+        return None
+
+    scheme = parts.scheme.lower()
+    host = parts.hostname.lower()
+    if ":" in host:
+        host = f"[{host}]"  # hostname strips the brackets of IPv6 literals
+    if port and not (scheme == "http" and port == 80) and not (scheme == "https" and port == 443):
+        host = f"{host}:{port}"
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                       if not k.lower().startswith(TRACKING_PARAMS)])
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def url_domain(url: str) -> str:
+    try:
+        host = urlsplit(url).hostname or ""
+    except ValueError:
+        return ""
+    return host[4:] if host.startswith("www.") else host
+
+
+class LinkStore:
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS links (
+                id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL UNIQUE,
+                domain TEXT NOT NULL,
+                row_number INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS links_domain ON links(domain);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        return conn
+
+    def rebuild_from_xlsx(self, xlsx_path: str, source_sha256: str = None) -> dict:
+        """
+        Streams the sheet row by row (openpyxl read-only mode) and replaces the
+        indexed links with its normalized, de-duplicated contents.
+        """
+        start = time.perf_counter()
+        workbook = lazy_import("openpyxl").load_workbook(xlsx_path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, None) or ()
+            headers = [str(value).strip() if value is not None else "" for value in header]
+            if LINK_COLUMN not in headers:
+                raise ValueError(f"The Excel file does not contain a column named '{LINK_COLUMN}'.")
+            column = headers.index(LINK_COLUMN)
+
+            seen = skipped = 0
+            with closing(self._connect()) as conn, conn:
+                conn.execute("DELETE FROM links")
+                for row_number, row in enumerate(rows, start=2):
+                    value = row[column] if column < len(row) else None
+                    if value is None or not str(value).strip():
+                        continue
+                    seen += 1
+                    url = normalize_url(value)
+                    if url is None:
+                        skipped += 1
+                        continue
+                    conn.execute("INSERT OR IGNORE INTO links (url, domain, row_number) VALUES (?, ?, ?)",
+                                 (url, url_domain(url), row_number))
+                total = conn.execute("SELECT COUNT(*) FROM links").fetchone()[0]
+                conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", [
+                    ("source_sha256", source_sha256 or ""),
+                    ("built_at", str(time.time())),
+                ])
+        finally:
+            workbook.close()
+
+        summary = {
+            "rows_with_links": seen,
+            "invalid": skipped,
+            "duplicates": seen - skipped - total,
+            "total_links": total,
+            "elapsed": round(time.perf_counter() - start, 3),
+        }
+        print(f"📇 Indexed {total} links from {xlsx_path}: {summary}")
+        return summary
+
+    def source_hash(self):
+        if not os.path.exists(self.path):
+            return None
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'source_sha256'").fetchone()
+            return row["value"] if row else None
+
+    def clear(self):
+        if os.path.exists(self.path):
+            with closing(self._connect()) as conn, conn:
+                conn.execute("DELETE FROM links")
+                conn.execute("DELETE FROM meta")
+
+    def count(self, domain: str = None) -> int:
+        with closing(self._connect()) as conn:
+            if domain:
+                return conn.execute("SELECT COUNT(*) FROM links WHERE domain = ?", (domain,)).fetchone()[0]
+            return conn.execute("SELECT COUNT(*) FROM links").fetchone()[0]
+
+    def list_links(self, offset: int = 0, limit: int = 100, domain: str = None) -> list:
+        query = "SELECT id, url, domain, row_number FROM links"
+        params = []
+        if domain:
+            query += " WHERE domain = ?"
+            params.append(domain)
+        query += " ORDER BY id LIMIT ? OFFSET ?"
+        params += [limit, offset]
+        with closing(self._connect()) as conn:
+            return [dict(row) for row in conn.execute(query, params)]
+
+    def all_urls(self, domain: str = None) -> list:
+        query = "SELECT url FROM links" + (" WHERE domain = ?" if domain else "") + " ORDER BY id"
+        with closing(self._connect()) as conn:
+            return [row["url"] for row in conn.execute(query, (domain,) if domain else ())]
+
+    def domains(self) -> list:
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT domain, COUNT(*) AS links FROM links GROUP BY domain ORDER BY links DESC")
+            return [dict(row) for row in rows]
+
+
+link_store = LinkStore()
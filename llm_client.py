@@ -0,0 +1,135 @@
+# llm_client.py
+#
+# Shared async client for OpenAI-compatible chat APIs: one pooled HTTP
+# connection pool, a concurrency + requests-per-minute limit, and retries
+# with exponential backoff. Point OPENAI_BASE_URL at benchmarks/llm_stub.py
+# to run without the real API.
+
+import asyncio
+import json
+import os
+import random
+import time
+from dotenv import load_dotenv
+from metrics import lazy_import
+
+
+load_dotenv()
+
+
+class RateLimiter:
+    """Token bucket allowing `per_minute` requests per minute with small bursts."""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class LLMDispatcher:
+    def __init__(self, model: str = "gpt-4o-mini", max_concurrency: int = 8, requests_per_minute: float = 500,
+                 max_retries: int = 4, timeout: float = 60.0, base_url: str = None, api_key: str = None):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.base_url = base_url
+        self.api_key = api_key
+        self._client = None
+        self._retryable = ()
+        self._slots = None
+        self._limiter = None
+        self.counters = {"requests": 0, "retries": 0, "failures": 0, "in_flight": 0}
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            model=os.getenv("LLM_MODEL", "gpt-4o-mini"),
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+            requests_per_minute=float(os.getenv("LLM_REQUESTS_PER_MINUTE", "500")),
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "4")),
+            timeout=float(os.getenv("LLM_TIMEOUT", "60")),
+            base_url=os.getenv("OPENAI_BASE_URL"),
+            api_key=os.getenv("OPENAI_API_KEY"),
+        )
+
+    def _ensure_client(self):
+        # Created lazily so the HTTP pool binds to the loop that actually uses it,
+        # and so openai/httpx are only imported once an LLM call is made
+        if self._client is None:
+            httpx = lazy_import("httpx")
+            openai = lazy_import("openai")
+            self._retryable = (openai.APIConnectionError, openai.APITimeoutError,
+                               openai.RateLimitError, openai.InternalServerError)
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.max_concurrency,
+                                    max_keepalive_connections=self.max_concurrency),
+                timeout=self.timeout,
+            )
+            self._client = openai.AsyncOpenAI(api_key=self.api_key or "not-set", base_url=self.base_url,
+                                       http_client=http_client, max_retries=0, timeout=self.timeout)
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._limiter = RateLimiter(self.requests_per_minute)
+        return self._client
+
+    async def chat_json(self, prompt: str) -> dict:
+        """
+        Sends one user prompt in JSON mode and returns the parsed object.
+        """
+        client = self._ensure_client()
+        async with self._slots:
+            for attempt in range(self.max_retries + 1):
+                await self._limiter.acquire()
+                self.counters["requests"] += 1
+                self.counters["in_flight"] += 1
+                try:
+                    response = await client.chat.completions.create(
+                        model=self.model,
+                        messages=[{"role": "user", "content": prompt}],
+                        response_format={"type": "json_object"},
+                    )
+                    return json.loads(response.choices[0].message.content.strip())
+                except self._retryable as e:
+                    if attempt == self.max_retries:
+                        self.counters["failures"] += 1
+                        raise
+                    delay = min(30.0, 0.5 * 2 ** attempt) * (0.5 + random.random())
+                    self.counters["retries"] += 1
+                    print(f"⚠️ LLM call failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                except Exception:
+                    self.counters["failures"] += 1
+                    raise
+                finally:
+                    self.counters["in_flight"] -= 1
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model,
+            "base_url": self.base_url,
+            "max_concurrency": self.max_concurrency,
+            "requests_per_minute": self.requests_per_minute,
+            **self.counters,
+        }
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+llm = LLMDispatcher.from_env()
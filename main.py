@@ -1,6 +1,8 @@
 # main.py
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 import os
 import uvicorn
@@ -8,6 +10,16 @@ import uvicorn
 from handlefile import router as file_router  # Importing the router from handlefile
 from dataexcel import router as excel_router
 from parse_resume import router as parse_router
+from batch_runner import router as batch_router
+from shard_runner import router as shard_router
+from browser_pool import pool as browser_pool
+from config import env_flag
+from ocr_service import ocr
+from resume_jobs import resume_jobs
+from llm_client import llm
+from selector_cache import selector_cache
+from artifact_store import artifacts
+import metrics
 
 
 app = FastAPI(title="Minimal AI Job Agent")
@@ -27,6 +39,36 @@ class UserProfile(BaseModel):
 app.include_router(file_router)
 app.include_router(excel_router)
 app.include_router(parse_router)
+app.include_router(batch_router)
+app.include_router(shard_router)
+
+# ========== Lifecycle ==========
+
+@app.on_event("startup")
+async def start_browser_pool():
+    # With BROWSER_POOL_LAZY the first lease starts the pool instead (see serve.py)
+    if not env_flag("BROWSER_POOL_LAZY", False):
+        await browser_pool.start()
+
+@app.on_event("shutdown")
+async def stop_browser_pool():
+    await browser_pool.stop()
+
+@app.on_event("shutdown")
+def stop_ocr_service():
+    ocr.shutdown()
+
+@app.on_event("shutdown")
+async def flush_selector_cache():
+    await run_in_threadpool(selector_cache.flush)
+
+@app.on_event("shutdown")
+async def stop_resume_jobs():
+    await resume_jobs.shutdown()
+
+@app.on_event("shutdown")
+async def close_llm_client():
+    await llm.close()
 
 # ========== Endpoints ==========
 
@@ -34,6 +76,45 @@ app.include_router(parse_router)
 def root():
     return {"message": "AI Job Agent is running."}
 
+@app.get("/browser-pool/")
+def browser_pool_status():
+    return browser_pool.stats()
+
+@app.get("/ocr-service/")
+def ocr_service_status():
+    return ocr.stats()
+
+@app.get("/selector-cache/")
+def selector_cache_stats():
+    return selector_cache.stats()
+
+@app.get("/artifacts/")
+def artifact_stats():
+    return artifacts.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    return metrics.registry.render_prometheus()
+
+@app.get("/metrics/startup")
+def metrics_startup():
+    return metrics.startup_report()
+
+@app.get("/metrics/stages")
+def metrics_stages():
+    return metrics.registry.snapshot()
+
+@app.get("/metrics/traces")
+def metrics_traces(limit: int = 50):
+    return metrics.list_traces(limit)
+
+@app.get("/metrics/traces/{run_id}")
+def metrics_trace(run_id: str):
+    trace = metrics.get_trace(run_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found.")
+    return trace
+
 @app.post("/upload-profile/")
 def upload_profile(profile: UserProfile):
     os.makedirs("data", exist_ok=True)
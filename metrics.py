@@ -0,0 +1,224 @@
+# metrics.py
+#
+# Stage-level timing spans. Every span is aggregated into a histogram per
+# (stage, outcome) and appended to the trace of the run it belongs to
+# (one link or one resume), so both "where does time go under load" and
+# "what happened on this one link" can be answered.
+
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+
+
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TRACE_DIR = os.getenv("METRICS_TRACE_DIR")  # also dump finished traces as JSON files when set
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, outcome: str, seconds: float):
+        with self._lock:
+            histogram = self._histograms.get((stage, outcome))
+            if histogram is None:
+                histogram = self._histograms[(stage, outcome)] = Histogram()
+            histogram.observe(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                f"{stage}/{outcome}": {
+                    "count": h.count,
+                    "sum": round(h.sum, 4),
+                    "mean": round(h.sum / h.count, 4) if h.count else None,
+                    "buckets": dict(zip(map(str, h.buckets), h.counts)),
+                }
+                for (stage, outcome), h in sorted(self._histograms.items())
+            }
+
+    def render_prometheus(self) -> str:
+        name = "pipeline_stage_seconds"
+        lines = [f"# HELP {name} Duration of pipeline stages.", f"# TYPE {name} histogram"]
+        with self._lock:
+            for (stage, outcome), h in sorted(self._histograms.items()):
+                labels = f'stage="{stage}",outcome="{outcome}"'
+                for bound, count in zip(h.buckets, h.counts):
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {h.count}')
+                lines.append(f"{name}_sum{{{labels}}} {h.sum:.6f}")
+                lines.append(f"{name}_count{{{labels}}} {h.count}")
+
+        report = startup_report()
+        lines += ["# HELP app_startup_seconds Time from process start to each startup phase.",
+                  "# TYPE app_startup_seconds gauge"]
+        lines += [f'app_startup_seconds{{phase="{phase}"}} {seconds:.6f}'
+                  for phase, seconds in report["phases"].items()]
+        lines += ["# HELP app_import_seconds Time taken by the first import of a heavy dependency.",
+                  "# TYPE app_import_seconds gauge"]
+        lines += [f'app_import_seconds{{module="{module}"}} {seconds:.6f}'
+                  for module, seconds in report["imports"].items()]
+        return "\n".join(lines) + "\n"
+
+
+class Trace:
+    def __init__(self, kind: str, subject: str = None):
+        self.run_id = uuid.uuid4().hex
+        self.kind = kind
+        self.subject = subject
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.finished_at = None
+        self.spans = []
+
+    def add(self, stage: str, start: float, duration: float, outcome: str, labels: dict):
+        self.spans.append({
+            "stage": stage,
+            "offset": round(start - self._start, 4),
+            "duration": round(duration, 4),
+            "outcome": outcome,
+            **labels,
+        })
+
+    def finish(self):
+        self.finished_at = time.time()
+        if TRACE_DIR:
+            os.makedirs(TRACE_DIR, exist_ok=True)
+            with open(os.path.join(TRACE_DIR, f"{self.run_id}.json"), "w") as f:
+                json.dump(self.to_dict(), f, indent=2)
+
+    def to_dict(self) -> dict:
+        return {
+            "run_id": self.run_id,
+            "kind": self.kind,
+            "subject": self.subject,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "spans": self.spans,
+        }
+
+
+registry = MetricsRegistry()
+current_trace = ContextVar("current_trace", default=None)
+_traces = OrderedDict()
+MAX_TRACES = int(os.getenv("METRICS_MAX_TRACES", "500"))
+_traces_lock = threading.Lock()
+
+
+def start_trace(kind: str, subject: str = None) -> Trace:
+    trace = Trace(kind, subject)
+    current_trace.set(trace)
+    with _traces_lock:
+        _traces[trace.run_id] = trace
+        while len(_traces) > MAX_TRACES:
+            _traces.popitem(last=False)
+    return trace
+
+
+def get_trace(run_id: str):
+    with _traces_lock:
+        trace = _traces.get(run_id)
+    return trace.to_dict() if trace else None
+
+
+def list_traces(limit: int = 50) -> list:
+    with _traces_lock:
+        traces = list(_traces.values())[-limit:]
+    return [{"run_id": t.run_id, "kind": t.kind, "subject": t.subject, "spans": len(t.spans),
+             "started_at": t.started_at, "finished_at": t.finished_at} for t in reversed(traces)]
+
+
+class span:
+    """
+    Times a pipeline stage. Usable as `with` or `async with`; set `.outcome`
+    inside the block to label the result ("error" is used on exceptions).
+
+        async with span("navigate") as s:
+            ...
+            s.outcome = "ok"
+    """
+
+    def __init__(self, stage: str, **labels):
+        self.stage = stage
+        self.labels = labels
+        self.outcome = "ok"
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._start
+        if exc_type is not None and exc_type is not GeneratorExit:
+            self.outcome = "error"
+        registry.observe(self.stage, str(self.outcome), duration)
+        trace = current_trace.get()
+        if trace is not None:
+            trace.add(self.stage, self._start, duration, str(self.outcome), self.labels)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+# =======================
+# Import and startup timing
+# =======================
+# Heavy dependencies (PyMuPDF, openai, openpyxl, Playwright, Pillow) are
+# imported on first use through lazy_import, so the app starts without them
+# and the cost of each first import is recorded. serve.py adds the startup phases.
+_startup = {"phases": {}, "imports": {}}
+_startup_lock = threading.Lock()
+
+
+def record_startup(phase: str, seconds: float):
+    with _startup_lock:
+        _startup["phases"][phase] = round(seconds, 6)
+
+
+def lazy_import(module_name: str):
+    """
+    Returns the module, importing it on first use and timing that import.
+    """
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    with _startup_lock:
+        _startup["imports"].setdefault(module_name, round(time.perf_counter() - start, 6))
+    return module
+
+
+def startup_report() -> dict:
+    with _startup_lock:
+        return {"phases": dict(_startup["phases"]), "imports": dict(_startup["imports"])}
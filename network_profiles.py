@@ -0,0 +1,116 @@
+# network_profiles.py
+#
+# Request routing profiles for Playwright contexts. The job pipeline only
+# needs the DOM, the Apply button and forms, so by default media, fonts,
+# images and analytics/ad hosts are aborted before they hit the network.
+
+import os
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+
+PROFILES = {
+    # Everything loads; used when screenshots/OCR need the page as a user sees it
+    "full": {"resource_types": set(), "block_trackers": False},
+    # Keeps images (layout-sensitive pages) but drops heavy media, fonts and trackers
+    "balanced": {"resource_types": {"media", "font"}, "block_trackers": True},
+    "lean": {"resource_types": {"image", "media", "font"}, "block_trackers": True},
+}
+
+TRACKER_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "doubleclick.net",
+    "adservice.google.com",
+    "facebook.net",
+    "connect.facebook.net",
+    "ads.linkedin.com",
+    "snap.licdn.com",
+    "bat.bing.com",
+    "clarity.ms",
+    "hotjar.com",
+    "fullstory.com",
+    "segment.io",
+    "segment.com",
+    "mixpanel.com",
+    "amplitude.com",
+    "optimizely.com",
+    "nr-data.net",
+    "newrelic.com",
+    "quantserve.com",
+    "scorecardresearch.com",
+    "taboola.com",
+    "outbrain.com",
+    "criteo.com",
+    "adnxs.com",
+    "tiktok.com",
+)
+
+DEFAULT_PROFILE = os.getenv("NETWORK_PROFILE", "lean")
+
+
+def is_tracker(url: str) -> bool:
+    host = urlsplit(url).hostname or ""
+    return any(host == tracker or host.endswith("." + tracker) for tracker in TRACKER_HOSTS)
+
+
+class NetworkProfile:
+    """
+    Routes every request of a context through the active profile and keeps
+    per-page counters of what was blocked and what was loaded.
+    """
+
+    def __init__(self, profile: str = DEFAULT_PROFILE):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown network profile: {profile}")
+        self.profile = profile
+        self.blocked_requests = 0
+        self.blocked_by_reason = defaultdict(int)
+        self.allowed_requests = 0
+        self.loaded_bytes = 0
+
+    async def install(self, context):
+        await context.route("**/*", self._handle)
+        context.on("response", self._on_response)
+
+    def set_profile(self, profile: str):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown network profile: {profile}")
+        if profile != self.profile:
+            print(f"🌐 Switching network profile {self.profile} -> {profile}")
+            self.profile = profile
+
+    def _block_reason(self, request):
+        rules = PROFILES[self.profile]
+        if request.resource_type in rules["resource_types"]:
+            return request.resource_type
+        if rules["block_trackers"] and is_tracker(request.url):
+            return "tracker"
+        return None
+
+    async def _handle(self, route):
+        reason = self._block_reason(route.request)
+        if reason is None:
+            self.allowed_requests += 1
+            await route.continue_()
+            return
+        self.blocked_requests += 1
+        self.blocked_by_reason[reason] += 1
+        await route.abort("blockedbyclient")
+
+    def _on_response(self, response):
+        try:
+            self.loaded_bytes += int(response.headers.get("content-length") or 0)
+        except ValueError:
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "profile": self.profile,
+            "blocked_requests": self.blocked_requests,
+            "blocked_by_reason": dict(self.blocked_by_reason),
+            "allowed_requests": self.allowed_requests,
+            "loaded_bytes": self.loaded_bytes,
+        }
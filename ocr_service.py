@@ -0,0 +1,116 @@
+# ocr_service.py
+#
+# Tesseract OCR in a process pool so recognising a screenshot never blocks
+# the asyncio event loop that drives the browser pages.
+
+import asyncio
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from metrics import lazy_import
+
+
+def _ocr_tile(mode: str, size: tuple, pixels: bytes) -> str:
+    # Runs inside a worker process; gets raw pixels of its tile only, so
+    # there is no PNG decode here and no full image pickled per tile
+    import pytesseract
+    from PIL import Image
+    return pytesseract.image_to_string(Image.frombytes(mode, size, pixels))
+
+
+def tile_boxes(width: int, height: int, tile_height: int) -> list:
+    return [(0, top, width, min(top + tile_height, height)) for top in range(0, height, tile_height)]
+
+
+def split_tiles(png_bytes: bytes, tile_height: int) -> list:
+    """
+    Decodes the image once and returns (mode, size, raw pixels) for each tile.
+    """
+    img = lazy_import("PIL.Image").open(io.BytesIO(png_bytes))
+    if img.mode not in ("RGB", "RGBA", "L"):
+        img = img.convert("RGB")  # palette images cannot be rebuilt from raw bytes alone
+    img.load()
+    tiles = []
+    for box in tile_boxes(img.width, img.height, tile_height):
+        tile = img.crop(box)
+        tiles.append((tile.mode, tile.size, tile.tobytes()))
+    return tiles
+
+
+class OCRService:
+    """
+    Awaitable OCR over in-memory PNG bytes. Tall images are split into
+    horizontal tiles that are recognised in parallel and joined in order.
+    """
+
+    def __init__(self, workers: int = None, tile_height: int = 2000):
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.tile_height = tile_height
+        self._executor = None
+        self._submitted = 0
+        self._finished = 0
+        self._busy_seconds = 0.0
+
+    @classmethod
+    def from_env(cls):
+        workers = int(os.getenv("OCR_WORKERS", "0")) or None
+        return cls(workers=workers, tile_height=int(os.getenv("OCR_TILE_HEIGHT", "2000")))
+
+    def resize(self, workers: int):
+        """Changes the worker count; only allowed before the first OCR call starts the pool."""
+        if self._executor is not None:
+            raise RuntimeError("OCR workers cannot be resized once the pool is running")
+        self.workers = max(1, workers)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn keeps forked copies of the event loop and browser pipes out of the workers
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    @property
+    def in_flight(self) -> int:
+        return self._submitted - self._finished
+
+    @property
+    def queue_depth(self) -> int:
+        """Tiles submitted but still waiting for a free worker."""
+        return max(0, self.in_flight - self.workers)
+
+    async def _run_tile(self, mode: str, size: tuple, pixels: bytes) -> str:
+        loop = asyncio.get_running_loop()
+        self._submitted += 1
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._get_executor(), _ocr_tile, mode, size, pixels)
+        finally:
+            self._finished += 1
+            self._busy_seconds += time.perf_counter() - start
+
+    async def image_to_text(self, png_bytes: bytes) -> str:
+        # Decoded and cropped once, off the event loop; each worker only receives its tile
+        tiles = await asyncio.to_thread(split_tiles, png_bytes, self.tile_height)
+        texts = await asyncio.gather(*(self._run_tile(*tile) for tile in tiles))
+        return "\n".join(text.strip("\n") for text in texts if text.strip())
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "tile_height": self.tile_height,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "tiles_done": self._finished,
+            "tile_seconds": round(self._busy_seconds, 3),
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Shared service, shut down by the FastAPI app (see main.py)
+ocr = OCRService.from_env()
@@ -0,0 +1,73 @@
+# page_text.py
+#
+# Pulls readable text straight from the DOM so scrape() only has to fall
+# back to OCR for pages without a usable text layer.
+
+MAIN_CONTENT_SELECTORS = [
+    "main",
+    "[role='main']",
+    "article",
+    "[class*='job-description']",
+    "[class*='jobDescription']",
+    "[id*='job-description']",
+    "[class*='description']",
+    "#content",
+]
+
+# Returns the longest main-content text (if any) and the full body text in one round trip
+DOM_TEXT_JS = """
+(selectors) => {
+    let main = "";
+    for (const selector of selectors) {
+        for (const el of document.querySelectorAll(selector)) {
+            const text = (el.innerText || "").trim();
+            if (text.length > main.length) main = text;
+        }
+    }
+    const body = document.body ? (document.body.innerText || "").trim() : "";
+    return {main, body};
+}
+"""
+
+
+def _flatten_accessibility(node, out):
+    name = (node.get("name") or "").strip()
+    if name and node.get("role") not in ("WebArea", "RootWebArea"):
+        out.append(name)
+    for child in node.get("children") or []:
+        _flatten_accessibility(child, out)
+
+
+async def accessibility_text(page) -> str:
+    try:
+        snapshot = await page.accessibility.snapshot()
+    except Exception:
+        return ""
+    if not snapshot:
+        return ""
+    parts = []
+    _flatten_accessibility(snapshot, parts)
+    return "\n".join(parts)
+
+
+async def extract_dom_text(page, min_chars: int) -> (str, str):
+    """
+    Returns (text, source) where source is "main", "body" or "accessibility".
+    Main-content text is preferred when it is long enough on its own; the
+    accessibility tree is only consulted when innerText comes up short.
+    """
+    try:
+        texts = await page.evaluate(DOM_TEXT_JS, MAIN_CONTENT_SELECTORS)
+    except Exception as e:
+        print(f"⚠️ DOM text extraction failed: {e}")
+        texts = {"main": "", "body": ""}
+
+    if len(texts["main"]) >= min_chars:
+        return texts["main"], "main"
+    if len(texts["body"]) >= min_chars:
+        return texts["body"], "body"
+
+    a11y = await accessibility_text(page)
+    if len(a11y) > len(texts["body"]):
+        return a11y, "accessibility"
+    return texts["body"], "body"
@@ -1,62 +1,75 @@
 import os
-import fitz  # PyMuPDF
-import openai
-from openai import OpenAI
-from dotenv import load_dotenv
 import json
-import glob
+import asyncio
+import tempfile
+from typing import List
 from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from resume_cache import resume_cache
+from pdf_text import extract_text
+from metrics import span, start_trace
+from llm_client import llm
+from uploads import save_upload, stored_hash
 
 
 router = APIRouter()
-#client = openai.OpenAI(api_key=api_key)
+MODEL = llm.model
+PROMPT_VERSION = "1"  # Bump whenever the prompt changes so cached results are not reused
+PDF_TEXT_MODE = os.getenv("PDF_TEXT_MODE", "auto")
+MAX_BULK_RESUMES = int(os.getenv("MAX_BULK_RESUMES", "50"))
+MAX_RESUME_BYTES = int(os.getenv("MAX_RESUME_BYTES", str(10 * 1024 * 1024)))
+RESUME_PATH = "data/resume.pdf"
+STRUCTURED_RESUME_PATH = "data/structured_resume.json"
+SNAPSHOT_DIR = "data/resume_snapshots"  # per-upload copies parsed by background jobs
 
-def extract_full_text(pdf_path):
-    doc = fitz.open(pdf_path)
-    full_text = []
 
-    for page_num, page in enumerate(doc):
-        blocks = page.get_text("dict")["blocks"]
-        for block in blocks:
-            if block["type"] == 0:  # text block
-                for line in block["lines"]:
-                    line_text = " ".join([span["text"] for span in line["spans"]])
-                    if line_text.strip():
-                        full_text.append(line_text.strip())
+def extract_full_text(pdf_path, mode=PDF_TEXT_MODE):
+    return extract_text(pdf_path, mode=mode)
 
-    return "\n".join(full_text)
 
-
-def ask_gpt_to_structure_resume(raw_text):
+async def ask_gpt_to_structure_resume(raw_text):
 
     prompt = f"""You are a resume parser. Here's the unstructured resume text extracted from a PDF: {raw_text} 
     You extract it into a structured JSON. 
     - Include all the details. 
     - Make sure the associations are correct: dates should go with roles, skills should not include random words, etc."""
 
-    response = client.chat.completions.create(
-        model='gpt-4o-mini',
-        messages=[{"role": "user", "content": prompt}],
-        response_format={"type": "json_object"}
-
-    )
-
-    parsed_resume = json.loads(response.choices[0].message.content.strip())
+    parsed_resume = await llm.chat_json(prompt)
 
     print(f"Structured Resume:\n{parsed_resume}")
     return parsed_resume
 
 
-@router.get("/parse-resume/")
-def parse_resume():
-    print("Works!")
-    resume_path = "data/resume.pdf"
-    resume_text = extract_full_text(resume_path)
-    structured = ask_gpt_to_structure_resume(resume_text)
+def _read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def structure_pdf(pdf_path, force_refresh=False) -> (dict, bool):
+    """
+    Returns the structured resume for a PDF and whether it came from the cache.
+    """
+    cache_key = resume_cache.make_key(await run_in_threadpool(_read_bytes, pdf_path), PROMPT_VERSION, MODEL)
 
+    with span("resume_cache") as s:
+        structured = None if force_refresh else await run_in_threadpool(resume_cache.get, cache_key)
+        s.outcome = "refresh" if force_refresh else "hit" if structured is not None else "miss"
+
+    if structured is not None:
+        print(f"⚡ Using cached structured resume ({cache_key[:12]})")
+        return structured, True
+
+    with span("pdf_extraction", mode=PDF_TEXT_MODE):
+        resume_text = await run_in_threadpool(extract_full_text, pdf_path)
+    async with span("llm_call", model=MODEL):
+        structured = await ask_gpt_to_structure_resume(resume_text)
+    await run_in_threadpool(resume_cache.put, cache_key, structured)
+    return structured, False
+
+
+def _write_structured(json_path, structured):
     os.makedirs("data", exist_ok=True)
 
-    json_path = "data/structured_resume.json"
     if os.path.exists(json_path):
         os.remove(json_path)
         print(f"Deleted old file: {json_path}")
@@ -65,4 +78,79 @@ def parse_resume():
     with open(json_path, "w") as f:
         json.dump(structured, f, indent=2)
 
-    return structured
\ No newline at end of file
+
+@router.get("/parse-resume/")
+async def parse_resume(force_refresh: bool = False):
+    print("Works!")
+    trace = start_trace("resume", RESUME_PATH)
+    try:
+        structured, _ = await structure_pdf(RESUME_PATH, force_refresh)
+    finally:
+        trace.finish()
+
+    await run_in_threadpool(_write_structured, STRUCTURED_RESUME_PATH, structured)
+
+    return structured
+
+
+async def parse_uploaded_resume(snapshot_path, sha256):
+    """
+    Background job for one upload: parses that upload's snapshot and only
+    publishes data/structured_resume.json if no newer resume replaced it.
+    """
+    trace = start_trace("resume", snapshot_path)
+    try:
+        structured, _ = await structure_pdf(snapshot_path)
+        if await run_in_threadpool(stored_hash, RESUME_PATH) == sha256:
+            await run_in_threadpool(_write_structured, STRUCTURED_RESUME_PATH, structured)
+        else:
+            print(f"⏭️ Resume {sha256[:12]} was replaced by a newer upload; not publishing its result")
+        return structured
+    finally:
+        trace.finish()
+        if os.path.exists(snapshot_path):
+            os.remove(snapshot_path)
+
+
+# =======================
+# Bulk Parse Endpoint
+# =======================
+@router.post("/parse-resumes/bulk")
+async def parse_resumes_bulk(files: List[UploadFile] = File(...), force_refresh: bool = False):
+    """
+    Structures many resumes concurrently; the shared LLM dispatcher enforces
+    the concurrency and rate limits. Does not touch data/structured_resume.json.
+    """
+    if len(files) > MAX_BULK_RESUMES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_RESUMES} resumes per request.")
+
+    with tempfile.TemporaryDirectory(prefix="bulk-resumes-") as tmp:
+        async def parse_one(index, file):
+            trace = start_trace("resume", file.filename)
+            try:
+                # Same streaming, size-capped and type-checked path as /upload-resume/
+                saved = await save_upload(file, os.path.join(tmp, f"{index}.pdf"), MAX_RESUME_BYTES,
+                                          extensions=(".pdf",), magic=b"%PDF")
+                structured, cached = await structure_pdf(saved["path"], force_refresh)
+                return {"filename": file.filename, "sha256": saved["sha256"],
+                        "cached": cached, "structured": structured}
+            except HTTPException as e:
+                return {"filename": file.filename, "error": e.detail}
+            except Exception as e:
+                return {"filename": file.filename, "error": f"{type(e).__name__}: {e}"}
+            finally:
+                trace.finish()
+
+        results = await asyncio.gather(*(parse_one(i, f) for i, f in enumerate(files)))
+
+    return {"total": len(results), "failed": sum(1 for r in results if "error" in r), "results": results}
+
+
+@router.get("/resume-cache/")
+def resume_cache_stats():
+    return resume_cache.stats()
+
+
+@router.get("/llm-client/")
+def llm_client_stats():
+    return llm.stats()
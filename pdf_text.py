@@ -0,0 +1,104 @@
+# pdf_text.py
+#
+# PDF text extraction engine with three modes:
+#   fast     - PyMuPDF's plain-text output, no span dictionaries
+#   layout   - text blocks sorted into reading order (multi-column aware)
+#   parallel - page ranges extracted in worker processes, for large documents
+# plus "dict", the original span-by-span walk, kept as a reference.
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from metrics import lazy_import
+
+
+MODES = ("auto", "fast", "layout", "parallel", "dict")
+PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "40"))
+PARALLEL_CHUNK_PAGES = int(os.getenv("PDF_PARALLEL_CHUNK_PAGES", "16"))
+
+
+def _clean_lines(lines) -> str:
+    return "\n".join(line.strip() for line in lines if line.strip())
+
+
+def fast_page_text(page) -> str:
+    return _clean_lines(page.get_text("text").splitlines())
+
+
+def layout_page_text(page) -> str:
+    blocks = page.get_text("blocks", sort=True)
+    # Block tuples are (x0, y0, x1, y1, text, block_no, block_type); type 0 is text
+    return _clean_lines(line for block in blocks if block[6] == 0 for line in block[4].splitlines())
+
+
+def dict_page_text(page) -> str:
+    lines = []
+    for block in page.get_text("dict")["blocks"]:
+        if block["type"] == 0:  # text block
+            for line in block["lines"]:
+                lines.append(" ".join([span["text"] for span in line["spans"]]))
+    return _clean_lines(lines)
+
+
+PAGE_EXTRACTORS = {
+    "fast": fast_page_text,
+    "layout": layout_page_text,
+    "dict": dict_page_text,
+}
+
+
+def _extract_range(pdf_path: str, start: int, stop: int, page_mode: str) -> list:
+    # Runs inside a worker process; each worker opens its own document
+    extractor = PAGE_EXTRACTORS[page_mode]
+    fitz = lazy_import("fitz")  # PyMuPDF
+    with fitz.open(pdf_path) as doc:
+        return [extractor(doc[i]) for i in range(start, stop)]
+
+
+def _iter_parallel(pdf_path: str, page_count: int, page_mode: str, workers: int, chunk_pages: int):
+    ranges = [(start, min(start + chunk_pages, page_count)) for start in range(0, page_count, chunk_pages)]
+    workers = min(workers or os.cpu_count() or 2, len(ranges))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        # map() keeps page order and hands back each range as soon as it is ready
+        results = executor.map(
+            _extract_range,
+            [pdf_path] * len(ranges),
+            [start for start, _ in ranges],
+            [stop for _, stop in ranges],
+            [page_mode] * len(ranges),
+        )
+        for texts in results:
+            yield from texts
+
+
+def iter_pdf_text(pdf_path: str, mode: str = "auto", page_mode: str = "fast",
+                  workers: int = None, chunk_pages: int = PARALLEL_CHUNK_PAGES):
+    """
+    Yields the text of each page in order. `auto` picks `parallel` for
+    documents with at least PDF_PARALLEL_MIN_PAGES pages and `fast` otherwise;
+    `page_mode` is the per-page extractor used by the parallel workers.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown PDF extraction mode: {mode}")
+
+    fitz = lazy_import("fitz")  # PyMuPDF
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+        if mode == "auto":
+            mode = "parallel" if page_count >= PARALLEL_MIN_PAGES else "fast"
+
+        if mode != "parallel":
+            extractor = PAGE_EXTRACTORS[mode]
+            for page in doc:
+                text = extractor(page)
+                if text:
+                    yield text
+            return
+
+    for text in _iter_parallel(pdf_path, page_count, page_mode, workers, chunk_pages):
+        if text:
+            yield text
+
+
+def extract_text(pdf_path: str, mode: str = "auto", **kwargs) -> str:
+    return "\n".join(iter_pdf_text(pdf_path, mode=mode, **kwargs))
@@ -0,0 +1,203 @@
+# readiness.py
+#
+# Event-driven page readiness. Every wait resolves on a real signal (DOM
+# mutation quiescence, network idle, element stability, navigation/popup)
+# and only falls back to its timeout as an upper bound. Waits are recorded
+# per stage in the WaitReport of the current link.
+
+import asyncio
+import time
+from contextvars import ContextVar
+
+
+class WaitReport:
+    def __init__(self):
+        self.stages = {}
+
+    def record(self, stage: str, waited: float, budget: float, signal: str):
+        entry = self.stages.setdefault(stage, {"calls": 0, "waited": 0.0, "budget": 0.0, "signals": {}})
+        entry["calls"] += 1
+        entry["waited"] += waited
+        entry["budget"] += budget
+        entry["signals"][signal] = entry["signals"].get(signal, 0) + 1
+
+    def to_dict(self) -> dict:
+        stages = {
+            stage: {
+                **entry,
+                "waited": round(entry["waited"], 3),
+                "budget": round(entry["budget"], 3),
+                "saved": round(entry["budget"] - entry["waited"], 3),
+            }
+            for stage, entry in self.stages.items()
+        }
+        waited = sum(entry["waited"] for entry in self.stages.values())
+        budget = sum(entry["budget"] for entry in self.stages.values())
+        return {"stages": stages, "waited": round(waited, 3), "saved": round(budget - waited, 3)}
+
+
+# Each link runs in its own task, so the report never leaks between links
+current_report = ContextVar("wait_report", default=None)
+
+
+def start_report() -> WaitReport:
+    report = WaitReport()
+    current_report.set(report)
+    return report
+
+
+# Waits that ended without a readiness signal saved nothing: their budget is
+# what they actually waited, so "saved" only counts waits that resolved early
+ABORTED_SIGNALS = ("cancelled", "error", "click_failed")
+
+
+def _record(stage: str, start: float, budget_ms: int, signal: str):
+    report = current_report.get()
+    if report is not None:
+        waited = time.perf_counter() - start
+        budget = waited if signal in ABORTED_SIGNALS else budget_ms / 1000
+        report.record(stage, waited, budget, signal)
+
+
+DOM_QUIET_JS = """
+([quietMs, timeoutMs]) => new Promise(resolve => {
+    let quietTimer, limitTimer;
+    const observer = new MutationObserver(() => {
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(() => done("dom_quiet"), quietMs);
+    });
+    const done = (signal) => {
+        observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(limitTimer);
+        resolve(signal);
+    };
+    observer.observe(document.documentElement || document, {childList: true, subtree: true, characterData: true});
+    quietTimer = setTimeout(() => done("dom_quiet"), quietMs);
+    limitTimer = setTimeout(() => done("timeout"), timeoutMs);
+})
+"""
+
+ELEMENT_STABLE_JS = """
+(el) => new Promise(resolve => {
+    let last = null, stableFrames = 0;
+    const check = () => {
+        if (!el.isConnected) return resolve("detached");
+        const r = el.getBoundingClientRect();
+        const key = `${r.x},${r.y},${r.width},${r.height}`;
+        if (key === last) {
+            if (++stableFrames >= 2) return resolve("stable");
+        } else {
+            stableFrames = 0;
+            last = key;
+        }
+        requestAnimationFrame(check);
+    };
+    requestAnimationFrame(check);
+})
+"""
+
+
+async def _dom_quiet(page, quiet_ms: int, timeout_ms: int) -> str:
+    if timeout_ms <= 0:
+        return "timeout"
+    try:
+        return await page.evaluate(DOM_QUIET_JS, [quiet_ms, timeout_ms])
+    except Exception:
+        # The execution context goes away when the page navigates mid-wait
+        return "navigated"
+
+
+async def _network_idle(page, timeout_ms: int) -> str:
+    if timeout_ms <= 0:
+        return "timeout"
+    try:
+        await page.wait_for_load_state("networkidle", timeout=timeout_ms)
+        return "network_idle"
+    except Exception:
+        return "timeout"
+
+
+async def settle(page, stage: str, budget_ms: int, network: bool = False, quiet_ms: int = 300) -> str:
+    """
+    Waits until the DOM stops mutating (and, with `network`, the network is
+    idle first), never longer than `budget_ms` in total.
+    """
+    start = time.perf_counter()
+    signal = None
+    if network:
+        signal = await _network_idle(page, budget_ms)
+    remaining = budget_ms - int((time.perf_counter() - start) * 1000)
+    dom_signal = await _dom_quiet(page, quiet_ms, remaining)
+    signal = dom_signal if signal in (None, "network_idle") else signal
+    _record(stage, start, budget_ms, signal)
+    return signal
+
+
+async def wait_for_element_stable(locator, stage: str, budget_ms: int) -> str:
+    """
+    Waits until the element keeps the same bounding box for two animation frames.
+    """
+    start = time.perf_counter()
+    try:
+        signal = await asyncio.wait_for(locator.evaluate(ELEMENT_STABLE_JS), timeout=budget_ms / 1000)
+    except asyncio.TimeoutError:
+        signal = "timeout"
+    except Exception:
+        signal = "error"
+    _record(stage, start, budget_ms, signal)
+    return signal
+
+
+async def click_and_wait(page, click, stage: str, budget_ms: int) -> str:
+    """
+    Runs `click` and waits for what it triggered: a main-frame navigation,
+    a popup, or the DOM settling after an in-page update.
+    """
+    loop = asyncio.get_running_loop()
+    triggered = loop.create_future()
+
+    def on_navigation(frame):
+        if frame == page.main_frame and not triggered.done():
+            triggered.set_result("navigation")
+
+    def on_popup(popup):
+        if not triggered.done():
+            triggered.set_result("popup")
+
+    page.on("framenavigated", on_navigation)
+    page.on("popup", on_popup)
+    start = time.perf_counter()
+    quiet = None
+    signal = None
+    try:
+        await click()
+        quiet = asyncio.ensure_future(_dom_quiet(page, 500, budget_ms))
+        await asyncio.wait({triggered, quiet}, timeout=budget_ms / 1000, return_when=asyncio.FIRST_COMPLETED)
+
+        if triggered.done():
+            signal = triggered.result()
+            remaining = budget_ms - int((time.perf_counter() - start) * 1000)
+            if signal == "navigation" and remaining > 0:
+                try:
+                    await page.wait_for_load_state("domcontentloaded", timeout=remaining)
+                except Exception:
+                    pass
+        elif quiet.done():
+            signal = quiet.result()
+        else:
+            signal = "timeout"
+    except asyncio.CancelledError:
+        # Link timeouts and job cancellation must reach the caller unchanged
+        signal = "cancelled"
+        raise
+    finally:
+        page.remove_listener("framenavigated", on_navigation)
+        page.remove_listener("popup", on_popup)
+        if quiet is not None and not quiet.done():
+            quiet.cancel()
+        if signal is None:
+            signal = "click_failed" if quiet is None else "error"
+        _record(stage, start, budget_ms, signal)
+
+    return signal
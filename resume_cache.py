@@ -0,0 +1,83 @@
+# resume_cache.py
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+class ResumeCache:
+    """
+    Structured resumes keyed by a hash of the PDF bytes, the prompt version
+    and the model. A small in-memory LRU sits in front of JSON files on disk.
+    """
+
+    def __init__(self, directory: str = "data/resume_cache", max_entries: int = 32):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(pdf_bytes: bytes, prompt_version: str, model: str) -> str:
+        digest = hashlib.sha256(pdf_bytes)
+        digest.update(f"|{prompt_version}|{model}".encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _remember(self, key: str, value: dict):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+
+            path = self._path(key)
+            if os.path.exists(path):
+                try:
+                    with open(path) as f:
+                        value = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"⚠️ Ignoring unreadable resume cache entry {path}: {e}")
+                else:
+                    self._remember(key, value)
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: dict):
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = self._path(key) + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(value, f, indent=2)
+            os.replace(tmp_path, self._path(key))
+            self._remember(key, value)
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else None,
+            "memory_entries": len(self._memory),
+        }
+
+
+resume_cache = ResumeCache()
@@ -0,0 +1,84 @@
+# resume_jobs.py
+#
+# Background jobs for resume parsing, so upload handlers can return
+# immediately. Jobs are coroutines on the app's event loop; a semaphore caps
+# how many parse at once, and their blocking parts (PDF extraction, file I/O)
+# run in worker threads.
+
+import asyncio
+import os
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+
+
+class ResumeJobQueue:
+    def __init__(self, workers: int = 2, max_jobs: int = 500):
+        self.workers = workers
+        self.max_jobs = max_jobs
+        self._slots = None
+        self._jobs = OrderedDict()
+        self._tasks = set()
+
+    def submit(self, fn, *args, **kwargs) -> str:
+        """
+        Schedules the coroutine function `fn` and returns the job id. Must be
+        called from the running event loop.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "status": "queued",
+            "result": None,
+            "error": None,
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        self._jobs[job["job_id"]] = job
+        self._prune()
+
+        task = asyncio.get_running_loop().create_task(self._run(job, fn, args, kwargs))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job["job_id"]
+
+    async def _run(self, job, fn, args, kwargs):
+        async with self._slots:
+            job["status"] = "running"
+            job["started_at"] = time.time()
+            try:
+                job["result"] = await fn(*args, **kwargs)
+                job["status"] = "done"
+            except asyncio.CancelledError:
+                job["status"] = "cancelled"
+                raise
+            except Exception as e:
+                job["status"] = "failed"
+                job["error"] = str(e)
+                traceback.print_exc()
+            finally:
+                job["finished_at"] = time.time()
+
+    def _prune(self):
+        # Forget the oldest finished jobs once we keep more than max_jobs
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_jobs:
+                break
+            if self._jobs[job_id]["status"] in ("done", "failed", "cancelled"):
+                del self._jobs[job_id]
+
+    def get(self, job_id: str):
+        job = self._jobs.get(job_id)
+        return dict(job) if job else None
+
+    async def shutdown(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+resume_jobs = ResumeJobQueue(workers=int(os.getenv("RESUME_PARSE_WORKERS", "2")))
@@ -0,0 +1,233 @@
+# selector_cache.py
+#
+# Remembers, per host or ATS, which selector and strategy found the Apply
+# button or the embedded form last time, so repeat visits can try it first
+# and skip the full candidate scan and lazy scroll loop.
+
+import asyncio
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, writes still merge
+    fcntl = None
+
+
+CACHE_PATH = "data/selector_cache.json"
+
+# URL markers of the ATS platforms we see most; pages on the same ATS share markup
+ATS_FINGERPRINTS = [
+    ("greenhouse.io", "greenhouse"),
+    ("lever.co", "lever"),
+    ("myworkdayjobs.com", "workday"),
+    ("workday.com", "workday"),
+    ("jobs.gem.com", "gem"),
+    ("google.com/about/careers", "google-careers"),
+]
+
+
+def site_fingerprint(url: str) -> str:
+    lowered = (url or "").lower()
+    for marker, name in ATS_FINGERPRINTS:
+        if marker in lowered:
+            return name
+    host = urlsplit(lowered).hostname or "unknown"
+    return host[4:] if host.startswith("www.") else host
+
+
+def form_fingerprint(url: str) -> str:
+    """
+    Key for embedded-form entries. Unlike Apply selectors these are not shared
+    per ATS: a form on one company's Greenhouse board says nothing about
+    another's, so they are keyed by host, plus the company slug (first path
+    segment) on ATS hosts.
+    """
+    parts = urlsplit((url or "").lower())
+    host = parts.hostname or "unknown"
+    host = host[4:] if host.startswith("www.") else host
+    if site_fingerprint(url) != host:
+        slug = next((segment for segment in parts.path.split("/") if segment), "")
+        return f"{host}/{slug}" if slug else host
+    return host
+
+
+class SelectorCache:
+    def __init__(self, path: str = CACHE_PATH, ttl_seconds: float = 14 * 24 * 3600, max_failures: int = 2,
+                 flush_delay: float = 2.0):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_failures = max_failures
+        self.flush_delay = flush_delay
+        self._flush_pending = False
+        self._lock = threading.Lock()
+        self._entries = None
+        self._dirty = {}  # (key, kind) -> entry, or None when removed; not yet written to disk
+        self._counters = {}
+
+    def _read_disk(self) -> dict:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _load(self) -> dict:
+        if self._entries is None:
+            self._entries = self._read_disk()
+        return self._entries
+
+    def _set(self, key: str, kind: str, entry):
+        entries = self._load()
+        if entry is None:
+            entries.get(key, {}).pop(kind, None)
+        else:
+            entries.setdefault(key, {})[kind] = entry
+        self._dirty[(key, kind)] = entry
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self.path + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _apply(entries: dict, changes: dict):
+        for (key, kind), entry in changes.items():
+            if entry is None:
+                entries.get(key, {}).pop(kind, None)
+                if key in entries and not entries[key]:
+                    del entries[key]
+            else:
+                entries.setdefault(key, {})[kind] = entry
+
+    def flush(self):
+        """
+        Writes pending changes. They are applied on top of the file as it is
+        now, so sharded workers (see shard_runner.py) sharing it never drop
+        each other's entries, and what they learned is picked up in the same step.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            changes, self._dirty = self._dirty, {}
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with self._file_lock():
+                merged = self._read_disk()
+                self._apply(merged, changes)
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(merged, f, indent=2)
+                os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ Could not write selector cache: {e}")
+            with self._lock:
+                self._dirty = {**changes, **self._dirty}
+            return
+        with self._lock:
+            # Changes made while the file was being written stay pending
+            self._apply(merged, self._dirty)
+            self._entries = merged
+
+    def _changed(self):
+        """
+        Schedules a flush. On an event loop, writes are debounced by
+        `flush_delay` and run in the default executor, so lookups and
+        successes on the hot path never touch the disk.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()  # called from a worker thread or plain script: already off the loop
+            return
+        with self._lock:
+            if self._flush_pending:
+                return
+            self._flush_pending = True
+        loop.call_later(self.flush_delay, self._start_flush, loop)
+
+    def _start_flush(self, loop):
+        with self._lock:
+            self._flush_pending = False
+        loop.run_in_executor(None, self.flush)
+
+    def _count(self, kind: str, counter: str):
+        counters = self._counters.setdefault(kind, {"hits": 0, "stale": 0, "misses": 0})
+        counters[counter] += 1
+
+    def lookup(self, key: str, kind: str):
+        """Returns the cached {"selector", "strategy", ...} entry, or None (counted as a miss)."""
+        with self._lock:
+            entries = self._load()
+            entry = entries.get(key, {}).get(kind)
+            expired = bool(entry) and time.time() - entry["last_success"] > self.ttl_seconds
+            if expired:
+                self._set(key, kind, None)
+                entry = None
+            if entry is None:
+                self._count(kind, "misses")
+            entry = dict(entry) if entry else None
+        if expired:
+            self._changed()
+        return entry
+
+    def record_success(self, key: str, kind: str, selector: str, strategy: str, cached: bool = False):
+        if not selector:
+            return
+        with self._lock:
+            entries = self._load()
+            previous = entries.get(key, {}).get(kind) or {}
+            self._set(key, kind, {
+                "selector": selector,
+                "strategy": strategy,
+                "successes": previous.get("successes", 0) + 1 if previous.get("selector") == selector else 1,
+                "failures": 0,
+                "last_success": time.time(),
+            })
+            if cached:
+                self._count(kind, "hits")
+        self._changed()
+
+    def record_failure(self, key: str, kind: str):
+        """A cached entry did not work; it is dropped after `max_failures` failures in a row."""
+        with self._lock:
+            entries = self._load()
+            entry = entries.get(key, {}).get(kind)
+            self._count(kind, "stale")
+            if entry is None:
+                return
+            # Replaced rather than mutated: a flush in another thread may be serialising it
+            entry = {**entry, "failures": entry["failures"] + 1}
+            if entry["failures"] >= self.max_failures:
+                self._set(key, kind, None)
+                print(f"🗑️ Expired cached {kind} selector for {key}")
+            else:
+                self._set(key, kind, entry)
+        self._changed()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._load()
+            kinds = {}
+            for kind, counters in self._counters.items():
+                lookups = sum(counters.values())
+                kinds[kind] = {**counters, "hit_rate": round(counters["hits"] / lookups, 3) if lookups else None}
+            return {"hosts": len(entries), "kinds": kinds, "entries": entries}
+
+
+selector_cache = SelectorCache(ttl_seconds=float(os.getenv("SELECTOR_CACHE_TTL_DAYS", "14")) * 24 * 3600)
+# Pending debounced writes are flushed at exit too (scripts, shard workers);
+# the FastAPI app also flushes in its shutdown hook
+atexit.register(selector_cache.flush)
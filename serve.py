@@ -0,0 +1,76 @@
+# serve.py
+#
+# Production entry point. `python main.py` runs uvicorn with reload for
+# development; this starts the same app without reload and without loading
+# the heavy dependencies up front: PyMuPDF, openai, openpyxl, Playwright and
+# Pillow are imported by the endpoints that first need them (see
+# metrics.lazy_import), and the browser pool starts on the first lease.
+#
+# To pay those imports once instead, preload them:
+#   SERVE_PRELOAD=1 gunicorn -k uvicorn.workers.UvicornWorker --preload -w 4 serve:app
+# imports them in the gunicorn master before it forks, so workers share the
+# pages. `python serve.py --preload` warms each worker before it accepts requests.
+#
+# Import and startup timings are served at /metrics/startup and /metrics.
+
+import time
+
+PROCESS_START = time.perf_counter()
+
+import argparse
+import os
+
+import metrics
+from config import env_flag
+
+
+HEAVY_MODULES = ("fitz", "openai", "httpx", "openpyxl", "playwright.async_api", "PIL.Image")
+
+os.environ.setdefault("BROWSER_POOL_LAZY", "1")
+
+
+def preload():
+    start = time.perf_counter()
+    for name in HEAVY_MODULES:
+        try:
+            metrics.lazy_import(name)
+        except ImportError as e:
+            print(f"⚠️ Could not preload {name}: {e}")
+    metrics.record_startup("preload", time.perf_counter() - start)
+
+
+if env_flag("SERVE_PRELOAD", False):
+    preload()
+
+_import_start = time.perf_counter()
+from main import app  # noqa: E402
+metrics.record_startup("import_app", time.perf_counter() - _import_start)
+
+
+@app.on_event("startup")
+def record_ready():
+    metrics.record_startup("ready", time.perf_counter() - PROCESS_START)
+    report = metrics.startup_report()
+    print(f"⏱️ Ready in {report['phases']['ready']:.3f}s "
+          f"(app import {report['phases']['import_app']:.3f}s, preloaded: {sorted(report['imports']) or 'none'})")
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the API without reload, with lazy heavy imports.")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")))
+    parser.add_argument("--preload", action="store_true", help="Import heavy dependencies before serving")
+    args = parser.parse_args()
+
+    if args.preload:
+        # uvicorn spawns its workers, so each one re-imports serve.py and preloads itself
+        os.environ["SERVE_PRELOAD"] = "1"
+    if args.workers > 1:
+        uvicorn.run("serve:app", host=args.host, port=args.port, workers=args.workers)
+    else:
+        if args.preload:
+            preload()
+        uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,294 @@
+# shard_runner.py
+#
+# Sharded batch runs: a coordinator splits the links across worker processes,
+# each with its own browser pool, OCR pool and event loop, so CPU-bound work
+# (OCR, stitching, candidate scoring, JSON) is no longer capped at one core.
+# Workers report every finished link back over a multiprocessing queue, and a
+# shard whose process dies is restarted with the links it had not finished.
+#
+# Host-wide limits are split between the shards: each gets its share of the
+# browsers (BROWSER_POOL_SIZE), OCR processes (OCR_WORKERS) and artifact disk
+# budget (ARTIFACT_MAX_MB, in its own data/artifacts/shard-N directory). Every
+# shard needs at least one browser and one OCR process, so the shard count is
+# capped at the smaller of the two limits; raise them to run more shards. The
+# selector cache file is shared; its writes merge under a file lock.
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import queue
+import time
+from collections import defaultdict
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from artifact_store import artifacts
+from batch_runner import JOBS, BatchJob, DEFAULT_PER_DOMAIN, DEFAULT_LINK_TIMEOUT, run_batch
+from browser_pool import pool as browser_pool
+from ocr_service import ocr
+from selector_cache import selector_cache
+from dataexcel import FILE_PATH, read_application_links
+from link_state import link_state
+
+
+router = APIRouter()
+
+DEFAULT_SHARDS = int(os.getenv("SHARD_WORKERS", str(os.cpu_count() or 1)))
+MAX_SHARD_RESTARTS = int(os.getenv("SHARD_MAX_RESTARTS", "2"))
+
+
+def split_by_domain(entries, shards: int) -> list:
+    """
+    Splits (index, entry) pairs into at most `shards` lists. All links of a
+    domain land in the same shard, so per-domain limits still hold globally;
+    the largest domains are placed first, each on the least loaded shard.
+    """
+    by_domain = defaultdict(list)
+    for index, entry in entries:
+        by_domain[entry["domain"]].append((index, entry["link"]))
+
+    buckets = [[] for _ in range(max(1, shards))]
+    for links in sorted(by_domain.values(), key=len, reverse=True):
+        min(buckets, key=len).extend(links)
+    return [bucket for bucket in buckets if bucket]
+
+
+def max_shards() -> int:
+    """
+    Shards beyond this would each still start one browser and one OCR
+    process, exceeding the configured totals.
+    """
+    return max(1, min(browser_pool.size, ocr.workers))
+
+
+def shard_limits(shards: int) -> dict:
+    """
+    Each shard's share of this process's configured browser, OCR and disk limits.
+    """
+    shards = max(1, shards)
+    return {
+        "browsers": max(1, browser_pool.size // shards),
+        "ocr_workers": max(1, ocr.workers // shards),
+        "artifact_bytes": artifacts.max_bytes // shards,
+    }
+
+
+# =======================
+# Worker Process
+# =======================
+def _shard_main(shard_id: int, links: list, results, max_concurrency, per_domain: int, link_timeout: float,
+                limits: dict):
+    """
+    Entry point of a shard process: runs its links through run_batch on a
+    private browser pool and reports each finished link as ("link", shard_id, index, entry).
+    """
+    asyncio.run(_run_shard(shard_id, links, results, max_concurrency, per_domain, link_timeout, limits))
+
+
+async def _run_shard(shard_id: int, links: list, results, max_concurrency, per_domain: int, link_timeout: float,
+                     limits: dict):
+    from browser_pool import BrowserPool
+
+    # The module-level services are configured from the same env as the
+    # coordinator's, so cut them down to this shard's share before first use
+    ocr.resize(limits["ocr_workers"])
+    artifacts.scope(f"shard-{shard_id}", limits["artifact_bytes"])
+    pool = BrowserPool.from_env(size=limits["browsers"])
+    await pool.start()
+    results.put(("started", shard_id, os.getpid(), None))
+
+    job = BatchJob([link for _, link in links], max_concurrency=max_concurrency or pool.capacity,
+                   per_domain=per_domain)
+    index_of = {id(entry): index for (index, _), entry in zip(links, job.links)}
+
+    def report(entry):
+        results.put(("link", shard_id, index_of[id(entry)], entry))
+
+    try:
+        await run_batch(job, pool=pool, link_timeout=link_timeout, on_entry=report)
+    finally:
+        await pool.stop()
+        ocr.shutdown()
+        await asyncio.to_thread(selector_cache.flush)
+    results.put(("finished", shard_id, os.getpid(), None))
+
+
+# =======================
+# Coordinator
+# =======================
+class ShardedJob(BatchJob):
+    def __init__(self, links, shards: int, max_concurrency, per_domain: int, max_restarts: int = MAX_SHARD_RESTARTS):
+        super().__init__(links, max_concurrency=max_concurrency, per_domain=per_domain)
+        self.requested_shards = max(1, shards)
+        self.shard_count = min(self.requested_shards, max_shards())
+        self.max_restarts = max_restarts
+        self.shards = []
+        self.limits = {}
+
+    def plan(self):
+        """
+        Splits the links that still need a run across the shards and fixes each shard's limits.
+        """
+        pending = [(index, entry) for index, entry in enumerate(self.links) if entry["status"] != "skipped"]
+        self.shards = [{"shard": shard_id, "links": links, "total": len(links), "restarts": 0}
+                       for shard_id, links in enumerate(split_by_domain(pending, self.shard_count))]
+        self.limits = shard_limits(len(self.shards))
+
+    def to_dict(self, include_links: bool = True) -> dict:
+        data = super().to_dict(include_links=include_links)
+        data["requested_shards"] = self.requested_shards
+        data["limits_per_shard"] = self.limits
+        data["shards"] = [
+            {key: value for key, value in shard.items() if key not in ("process", "links")}
+            for shard in self.shards
+        ]
+        return data
+
+
+async def run_sharded(job: ShardedJob, link_timeout: float = DEFAULT_LINK_TIMEOUT, poll_seconds: float = 1.0):
+    """
+    Starts one spawn process per shard and folds their results into `job`.
+    A shard that exits without reporting "finished" is restarted with its
+    unfinished links, up to `job.max_restarts` times; after that its
+    remaining links are marked failed.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    if not job.shards:
+        job.plan()
+    limits = job.limits
+
+    def launch(shard):
+        remaining = [(index, link) for index, link in shard["links"] if job.links[index]["status"] == "pending"]
+        process = ctx.Process(target=_shard_main, name=f"shard-{shard['shard']}", daemon=True,
+                              args=(shard["shard"], remaining, results, job.max_concurrency,
+                                    job.per_domain, link_timeout, limits))
+        process.start()
+        shard.update(process=process, pid=process.pid, status="starting", remaining=len(remaining))
+
+    def handle(message):
+        kind, shard_id, value, entry = message
+        shard = job.shards[shard_id]
+        if kind == "started":
+            shard["status"] = "running"
+        elif kind == "link":
+            job.links[value].update(entry)
+            shard["remaining"] -= 1
+        elif kind == "finished":
+            shard["status"] = "finished"
+
+    job.status = "running"
+    job.started_at = time.time()
+    try:
+        for shard in job.shards:
+            launch(shard)
+
+        while any(shard["status"] not in ("finished", "crashed") for shard in job.shards):
+            try:
+                handle(await asyncio.to_thread(results.get, True, poll_seconds))
+                continue
+            except queue.Empty:
+                pass
+
+            for shard in job.shards:
+                process = shard["process"]
+                if shard["status"] in ("finished", "crashed") or process.is_alive():
+                    continue
+                # Fold in anything the shard managed to send before it died
+                try:
+                    while True:
+                        handle(results.get_nowait())
+                except queue.Empty:
+                    pass
+                if shard["status"] == "finished":
+                    continue
+
+                print(f"⚠️ Shard {shard['shard']} (pid {process.pid}) exited with code {process.exitcode}")
+                if shard["restarts"] < job.max_restarts:
+                    shard["restarts"] += 1
+                    launch(shard)
+                else:
+                    shard["status"] = "crashed"
+                    for index, _ in shard["links"]:
+                        if job.links[index]["status"] == "pending":
+                            job.links[index].update(status="failed",
+                                                    error=f"Shard crashed (exit code {process.exitcode})")
+        job.status = "completed"
+    except asyncio.CancelledError:
+        job.status = "cancelled"
+        raise
+    finally:
+        for shard in job.shards:
+            process = shard.get("process")
+            if process is not None and process.is_alive():
+                process.terminate()
+        job.finished_at = time.time()
+        print(f"✅ Sharded batch {job.id[:8]} {job.status} on {len(job.shards)} shards: {job.progress()}")
+
+
+async def prepare_job(links, shards: int, max_concurrency, per_domain: int, force: bool) -> (ShardedJob, int):
+    job = ShardedJob(links, shards=shards, max_concurrency=max_concurrency, per_domain=max(1, per_domain))
+    # Same resume rules as /run-links/: completed links are skipped unless forced
+    if force:
+        await run_in_threadpool(link_state.reset_links, links)
+        completed = set()
+    else:
+        completed = await run_in_threadpool(link_state.completed_links, links)
+    for entry in job.links:
+        if entry["link"] in completed:
+            entry["status"] = "skipped"
+    job.plan()
+    return job, len(completed)
+
+
+# =======================
+# Start Sharded Run Endpoint
+# =======================
+@router.post("/run-links/sharded/")
+async def run_links_sharded(shards: int = DEFAULT_SHARDS, max_concurrency: int = None,
+                            per_domain: int = DEFAULT_PER_DOMAIN, domain: str = None, force: bool = False):
+    if not os.path.exists(FILE_PATH):
+        raise HTTPException(status_code=404, detail="Excel file not found. Please upload the file first.")
+
+    links = await run_in_threadpool(read_application_links, domain)
+    if not links:
+        return {"status": "No links found in the Excel file."}
+
+    job, skipped = await prepare_job(links, shards, max_concurrency, per_domain, force)
+    JOBS[job.id] = job
+    job.task = asyncio.create_task(run_sharded(job))
+
+    return {"status": "Sharded batch run started", "job_id": job.id, "shards": len(job.shards),
+            "requested_shards": job.requested_shards, "limits_per_shard": job.limits,
+            "total_links": len(links), "skipped": skipped}
+
+
+async def _main(args):
+    links = read_application_links(args.domain)
+    if not links:
+        print("No links found in the Excel file.")
+        return
+    job, skipped = await prepare_job(links, args.shards, args.max_concurrency, args.per_domain, args.force)
+    print(f"🚀 Running {len(links)} links ({skipped} already completed) on {len(job.shards)} shards "
+          f"({args.shards} requested, {job.limits} each)")
+
+    task = asyncio.create_task(run_sharded(job, link_timeout=args.link_timeout))
+    while not task.done():
+        await asyncio.wait({task}, timeout=args.progress_every)
+        progress = job.progress()
+        print(f"📊 {progress['finished']}/{progress['total']} links ({progress['percent']}%), "
+              f"{progress.get('failed', 0)} failed")
+    await task
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the job links on several worker processes.")
+    parser.add_argument("--shards", type=int, default=DEFAULT_SHARDS)
+    parser.add_argument("--max-concurrency", type=int, default=None, help="Links in flight per shard")
+    parser.add_argument("--per-domain", type=int, default=DEFAULT_PER_DOMAIN)
+    parser.add_argument("--domain", default=None)
+    parser.add_argument("--force", action="store_true", help="Ignore state from earlier runs")
+    parser.add_argument("--link-timeout", type=float, default=DEFAULT_LINK_TIMEOUT)
+    parser.add_argument("--progress-every", type=float, default=5.0)
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,132 @@
+# uploads.py
+#
+# Async, chunked upload pipeline: streams an UploadFile to a temp file next
+# to its destination, hashes it on the fly, enforces size/type limits as the
+# bytes arrive and atomically renames it into place.
+
+import hashlib
+import os
+import shutil
+import tempfile
+import uuid
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+
+CHUNK_SIZE = 1024 * 1024  # 1 MiB
+
+
+def hash_path(dest_path: str) -> str:
+    return f"{dest_path}.sha256"
+
+
+def stored_hash(dest_path: str):
+    """Returns the content hash recorded for dest_path, if the file still exists."""
+    if not os.path.exists(dest_path) or not os.path.exists(hash_path(dest_path)):
+        return None
+    with open(hash_path(dest_path)) as f:
+        return f.read().strip()
+
+
+def ensure_hash(dest_path: str):
+    """
+    Like stored_hash, but hashes and records files saved without a sidecar
+    (e.g. before uploads were hashed). Returns None if the file does not exist.
+    """
+    sha256 = stored_hash(dest_path)
+    if sha256 is not None or not os.path.exists(dest_path):
+        return sha256
+    digest = hashlib.sha256()
+    with open(dest_path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    sha256 = digest.hexdigest()
+    with open(hash_path(dest_path), "w") as f:
+        f.write(sha256)
+    return sha256
+
+
+def remove_with_hash(dest_path: str):
+    for path in (dest_path, hash_path(dest_path)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _write_chunk(out, digest, chunk: bytes):
+    digest.update(chunk)
+    out.write(chunk)
+
+
+def _snapshot(tmp_path: str, snapshot_dir: str, dest_path: str) -> str:
+    os.makedirs(snapshot_dir, exist_ok=True)
+    path = os.path.join(snapshot_dir, f"{uuid.uuid4().hex}{os.path.splitext(dest_path)[1]}")
+    try:
+        os.link(tmp_path, path)  # same bytes, no copy; survives the next upload replacing dest_path
+    except OSError:
+        shutil.copyfile(tmp_path, path)  # filesystems without hard links
+    return path
+
+
+def _commit(tmp_path: str, dest_path: str, sha256: str):
+    os.replace(tmp_path, dest_path)
+    with open(hash_path(dest_path), "w") as f:
+        f.write(sha256)
+
+
+async def save_upload(file: UploadFile, dest_path: str, max_bytes: int, extensions=(), magic: bytes = None,
+                      overwrite: bool = True, snapshot_dir: str = None) -> dict:
+    """
+    Saves the upload to dest_path and returns its path, sha256, size and status:
+    "created", "replaced", "unchanged" (identical content, nothing written) or
+    "exists" (different content but overwrite=False, nothing written).
+
+    With `snapshot_dir`, a written upload also gets a private copy there
+    ("snapshot" in the result) that later uploads to dest_path cannot replace.
+    The caller removes it when done.
+    """
+    filename = (file.filename or "").lower()
+    if extensions and not filename.endswith(tuple(extensions)):
+        raise HTTPException(status_code=415, detail=f"Unsupported file type. Expected one of: {', '.join(extensions)}")
+
+    directory = os.path.dirname(dest_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if size == 0 and magic and not chunk.startswith(magic):
+                    raise HTTPException(status_code=415, detail="File content does not match the expected type.")
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"File is larger than {max_bytes} bytes.")
+                await run_in_threadpool(_write_chunk, out, digest, chunk)
+
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Uploaded file is empty.")
+
+        sha256 = digest.hexdigest()
+        result = {"path": dest_path, "sha256": sha256, "size": size}
+        existed = os.path.exists(dest_path)
+
+        if existed and stored_hash(dest_path) == sha256:
+            os.remove(tmp_path)
+            return {**result, "status": "unchanged"}
+        if existed and not overwrite:
+            os.remove(tmp_path)
+            return {**result, "status": "exists"}
+
+        if snapshot_dir:
+            result["snapshot"] = await run_in_threadpool(_snapshot, tmp_path, snapshot_dir, dest_path)
+        await run_in_threadpool(_commit, tmp_path, dest_path, sha256)
+        return {**result, "status": "replaced" if existed else "created"}
+
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -1,160 +1,403 @@
 import asyncio
+import hashlib
+import io
 import json
 import re
 import os
-from PIL import Image
-import pytesseract
-from playwright.async_api import async_playwright
+import time
+from browser_pool import BrowserPool
+from link_state import LinkStateStore
+from selector_cache import selector_cache, site_fingerprint, form_fingerprint
+from network_profiles import NetworkProfile, DEFAULT_PROFILE
+from consent_store import consent_store
+from artifact_store import artifacts
+from form_autofill import AUTOFILL_ENABLED, autofill_page
+from link_store import url_domain
+from readiness import settle, wait_for_element_stable, click_and_wait, start_report
+from page_text import extract_dom_text
+from ocr_service import ocr
+from metrics import span, start_trace, lazy_import
+
+
+
+async def open_page_and_capture(link: str, pool: BrowserPool = None, state: LinkStateStore = None,
+                                network_profile: str = DEFAULT_PROFILE):
+    """
+    Runs the full pipeline for one link. With a `state` store every stage is
+    recorded, and a link that already got past scraping resumes after it.
+    """
+    # Without a shared pool (e.g. when run as a script) use a private one-browser pool
+    owns_pool = pool is None
+    if owns_pool:
+        pool = BrowserPool(size=1, contexts_per_browser=1)
 
+    previous = await asyncio.to_thread(state.get, link) if state else {}
 
+    # Domains where a cookie banner was answered before start with that consent
+    domain = url_domain(link)
+    stored_state = consent_store.state_path(domain)
+    context_options = {"storage_state": stored_state} if stored_state else {}
 
-async def open_page_and_capture(link: str):
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=False)
-        context = await browser.new_context(
-            viewport={"width": 1280, "height": 800},
-            device_scale_factor=1,
-        )
-        page = await context.new_page()
-        print(f"Navigating to {link}")
-        await page.goto(link, wait_until="domcontentloaded", timeout=60000)
-        await page.wait_for_timeout(5000)
+    waits = start_report()
+    trace = start_trace("link", link)
+    try:
+        async with span("link") as link_span, pool.lease(**context_options) as page:
+            network = NetworkProfile(network_profile)
+            await network.install(page.context)
 
-        await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-        await page.wait_for_timeout(2000)
+            print(f"Navigating to {link}")
+            async with span("navigate"):
+                await page.goto(link, wait_until="domcontentloaded", timeout=60000)
+                await settle(page, "navigate", 5000, network=True)
+            if state:
+                await asyncio.to_thread(state.record, link, "navigated", url=page.url)
 
-        try:
-            await page.wait_for_selector("body", state="visible", timeout=10000)
-        except Exception:
-            print("⚠️ Body not visible, continuing anyway...")
-
-        await handle_cookie_prompt(page)
+            await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+            await settle(page, "scroll_to_bottom", 2000)
 
-        screenshot_path = "viewport_screenshot.png"
-        await page.screenshot(path=screenshot_path)
-        print(f"✅ Screenshot saved to: {screenshot_path}")
+            try:
+                await page.wait_for_selector("body", state="visible", timeout=10000)
+            except Exception:
+                print("⚠️ Body not visible, continuing anyway...")
+
+            async with span("cookie") as s:
+                if stored_state:
+                    s.outcome = "stored_state"
+                elif await handle_cookie_prompt(page):
+                    s.outcome = "clicked"
+                    await consent_store.save(page.context, domain)
+                else:
+                    s.outcome = "none"
+
+            await capture_artifact(page, "viewport")
+
+            if "scraped" in previous:
+                scraped = previous["scraped"]
+                print(f"⏭️ Page text already extracted ({scraped['text_hash'][:12]}), skipping scrape")
+            else:
+                async with span("scrape") as s:
+                    page_text = await scrape(page=page, link=link, network=network)
+                    s.outcome = page_text["source"]
+                scraped = {
+                    "text_source": page_text["source"],
+                    "text_chars": len(page_text["text"]),
+                    "text_elapsed": page_text["elapsed"],
+                    "text_hash": hashlib.sha256(page_text["text"].encode()).hexdigest(),
+                }
+                if state:
+                    await asyncio.to_thread(state.record, link, "scraped", **scraped)
+
+            result = {
+                "link": link,
+                "trace_id": trace.run_id,
+                "resumed": "scraped" in previous,
+                **{key: value for key, value in scraped.items() if key != "recorded_at"},
+                "apply_clicked": False,
+                "form_detected": False,
+            }
+            # A cached Apply selector goes first; pages where a form was found last
+            # time then skip the Apply search. Both keys are taken before any click.
+            key = site_fingerprint(page.url)
+            if await try_cached_apply_button(page, key):
+                result["apply_clicked"] = True
+            elif await try_cached_form(page, form_fingerprint(page.url)):
+                result["form_detected"] = True
+            elif await try_click_apply_button(page, key, use_cache=False):
+                result["apply_clicked"] = True
+            else:
+                print("❌ No Apply button could be interacted with via standard logic")
+                if await is_embedded_form_present(page):
+                    result["form_detected"] = True
+                else:
+                    async with span("lazy_scroll") as s:
+                        result["apply_clicked"] = await lazy_scroll_and_find_apply_button(page, key)
+                        s.outcome = "clicked" if result["apply_clicked"] else "not_found"
+
+            if AUTOFILL_ENABLED and (result["apply_clicked"] or result["form_detected"]):
+                # An Apply click that opened a popup leaves the form on the newest page
+                result["autofill"] = await autofill_page(page.context.pages[-1])
+
+            if state:
+                await asyncio.to_thread(state.record, link, "completed",
+                                        apply_clicked=result["apply_clicked"], form_detected=result["form_detected"])
+
+            result["network"] = network.stats()
+            print(f"🌐 Blocked {result['network']['blocked_requests']} requests "
+                  f"({result['network']['blocked_by_reason']}), loaded ~{result['network']['loaded_bytes']} bytes")
+
+            result["waits"] = waits.to_dict()
+            print(f"⏱️ Waited {result['waits']['waited']}s in readiness checks, saved {result['waits']['saved']}s")
+
+            link_span.outcome = "applied" if result["apply_clicked"] else "form" if result["form_detected"] else "no_apply"
+            return result
+    finally:
+        trace.finish()
+        if owns_pool:
+            await pool.stop()
+
+
+async def capture_artifact(page, name: str):
+    """
+    Screenshots the viewport into the artifact store. A failed capture never
+    fails the link.
+    """
+    try:
+        png_bytes = await page.screenshot()
+    except Exception as e:
+        print(f"⚠️ Screenshot {name} failed: {e}")
+        return None
+    return await artifacts.save(name, png_bytes)
 
-        await scrape(page=page, link=link)
 
-        if not await try_click_apply_button(page):
-            print("❌ No Apply button could be interacted with via standard logic")
-            if not await is_embedded_form_present(page):
-                await lazy_scroll_and_find_apply_button(page)
+COOKIE_BUTTON_TEXTS = ["accept all", "reject all", "decline the cookies"]
+COOKIE_ATTR = "data-cookie-candidate"
 
-        await browser.close()
+# Finds the first consent button in one DOM query and stamps it for clicking
+FIND_COOKIE_BUTTON_JS = """
+([texts, attr]) => {
+    for (const el of document.querySelectorAll("button, a")) {
+        const text = (el.innerText || el.textContent || "").trim().toLowerCase();
+        if (texts.includes(text)) {
+            el.setAttribute(attr, "1");
+            return text;
+        }
+    }
+    return null;
+}
+"""
 
 
 async def handle_cookie_prompt(page):
     print("🔍 Checking for cookie prompt...")
     try:
-        buttons = page.locator("button, a",
-                               has_text=re.compile(r"(accept all|reject all|Decline the cookies|cookie settings)", re.IGNORECASE))
-        count = await buttons.count()
-
-        for i in range(count):
-            button = buttons.nth(i)
-            text = await button.inner_text()
-            if text.lower() in ["accept all", "reject all", "Decline the cookies"]:
-                print(f"✅ Found cookie button: {text}. Clicking it...")
-                await button.click()
-                await page.wait_for_timeout(2000)
-                print("✅ Cookie prompt handled successfully.")
-                return
+        text = await page.evaluate(FIND_COOKIE_BUTTON_JS, [COOKIE_BUTTON_TEXTS, COOKIE_ATTR])
+        if text:
+            print(f"✅ Found cookie button: {text}. Clicking it...")
+            button = page.locator(f"[{COOKIE_ATTR}]").first
+            await click_and_wait(page, button.click, "cookie_click", 2000)
+            print("✅ Cookie prompt handled successfully.")
+            return True
     except Exception as e:
         print(f"⚠️ Cookie prompt detection failed: {e}")
     print("❌ No cookie prompt detected or handled.")
+    return False
+
 
+MIN_DOM_TEXT_CHARS = int(os.getenv("MIN_DOM_TEXT_CHARS", "500"))
 
-async def scrape(page, link):
+
+async def scrape(page, link, min_chars: int = MIN_DOM_TEXT_CHARS, network: NetworkProfile = None) -> dict:
+    """
+    Returns the job-page text with its source ("main", "body",
+    "accessibility" or "ocr") and how long extraction took.
+    OCR only runs when the DOM text is shorter than `min_chars`.
+    """
     print("inside scrape")
     await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-    await page.wait_for_timeout(2000)
+    await settle(page, "scrape_scroll", 2000)
+
+    start = time.perf_counter()
+    text, source = await extract_dom_text(page, min_chars)
+
+    if len(text) < min_chars:
+        print(f"⚠️ Only {len(text)} characters of DOM text, falling back to OCR")
+        if network and network.profile != "full":
+            # OCR needs the page as a user sees it: reload with images and fonts
+            network.set_profile("full")
+            await page.reload(wait_until="domcontentloaded")
+            await settle(page, "full_fidelity_reload", 5000, network=True)
+        screenshot = await page.screenshot(full_page=True)
+        print("📸 Full page screenshot taken.")
+
+        async with span("ocr", kind="full_page"):
+            ocr_text = await ocr.image_to_text(screenshot)
+
+        if len(ocr_text) < 2000:
+            print("Scroll and capture function invoked")
+            capture = await scroll_and_capture_all(page)
+            if len(capture["text"]) > len(ocr_text):
+                ocr_text = capture["text"]
+
+        if len(ocr_text.strip()) > len(text):
+            text, source = ocr_text, "ocr"
+
+    elapsed = round(time.perf_counter() - start, 3)
+    print(f"🧠 Extracted {len(text)} characters of page text from {source} in {elapsed}s")
+    return {"text": text, "source": source, "elapsed": elapsed}
+
+
+MAX_CAPTURE_SLICES = int(os.getenv("MAX_CAPTURE_SLICES", "40"))
+KEEP_STITCHED_CAPTURE = os.getenv("KEEP_STITCHED_CAPTURE", "0").lower() in ("1", "true", "yes")
 
-    screenshot_path = "fullpage.png"
-    await page.screenshot(path=screenshot_path, full_page=True)
-    print("📸 Full page screenshot taken.")
 
-    img = Image.open(screenshot_path)
-    text = pytesseract.image_to_string(img)
+async def iter_viewport_slices(page, max_slices: int = MAX_CAPTURE_SLICES):
+    """
+    Yields (scroll_y, png_bytes) for each viewport of the page, top to bottom.
+    At most `max_slices` slices are taken so very long pages stay bounded.
+    """
+    total_height = await page.evaluate("() => document.body.scrollHeight")
+    view_height = (page.viewport_size or {}).get("height") or 800
+    last_y = None
+
+    for offset in range(0, total_height, view_height)[:max_slices]:
+        scroll_y = await page.evaluate("(y) => { window.scrollTo(0, y); return window.scrollY; }", offset)
+        if scroll_y == last_y:
+            break  # the page is shorter than scrollHeight suggested
+        last_y = scroll_y
+        await settle(page, "capture_slice", 1000, network=True, quiet_ms=150)
+        yield scroll_y, await page.screenshot()
+
+
+class SliceStitcher:
+    """
+    Collects compressed slices and only decodes them when a stitched image is rendered.
+    """
 
-    if len(text) < 2000:
-        print("Scroll and capture function invoked")
-        await scroll_and_capture_all(link)
+    def __init__(self):
+        self.slices = []
 
-    print("🧠 OCR Result:\n", text[:5000])
+    def add(self, scroll_y: int, png_bytes: bytes):
+        self.slices.append((scroll_y, png_bytes))
 
+    def render(self) -> bytes:
+        Image = lazy_import("PIL.Image")
+        images = [(y, Image.open(io.BytesIO(png))) for y, png in self.slices]
+        width = max(img.width for _, img in images)
+        height = max(y + img.height for y, img in images)
+        stitched = Image.new("RGB", (width, height))
+        for y, img in images:
+            stitched.paste(img, (0, y))
+        out = io.BytesIO()
+        stitched.save(out, format="PNG")
+        return out.getvalue()
 
-async def scroll_and_capture_all(link: str):
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=False)
-        context = await browser.new_context(
-            viewport={"width": 1920, "height": 1080},
-            device_scale_factor=1,
-        )
-        page = await context.new_page()
-        await page.goto(link, wait_until="networkidle", timeout=60000)
 
-        total_height = await page.evaluate("() => document.body.scrollHeight")
-        view_height = 1080
-        screenshots = []
+async def scroll_and_capture_all(page, keep_stitched: bool = KEEP_STITCHED_CAPTURE) -> dict:
+    """
+    Scrolls the already open page one viewport at a time and OCRs every slice
+    as soon as it is captured. A stitched image is only built when asked for.
+    """
+    ocr_tasks = []
+    stitcher = SliceStitcher() if keep_stitched else None
 
-        for i, offset in enumerate(range(0, total_height, view_height)):
-            await page.evaluate(f"window.scrollTo(0, {offset})")
-            await page.wait_for_timeout(1000)
-            path = f"screenshot_{i}.png"
-            await page.screenshot(path=path)
-            screenshots.append(path)
+    async for scroll_y, png_bytes in iter_viewport_slices(page):
+        ocr_tasks.append(asyncio.ensure_future(ocr.image_to_text(png_bytes)))
+        if stitcher:
+            stitcher.add(scroll_y, png_bytes)
 
-        await browser.close()
+    texts = await asyncio.gather(*ocr_tasks)
+    capture = {"text": "\n".join(text for text in texts if text), "slices": len(ocr_tasks), "stitched": None}
 
-        stitched = Image.new("RGB", (1920, view_height * len(screenshots)))
-        for i, file in enumerate(screenshots):
-            img = Image.open(file)
-            stitched.paste(img, (0, i * view_height))
-        stitched.save("stitched_full_page.png")
-        print("✅ Stitched screenshot saved as: stitched_full_page.png")
+    if stitcher and stitcher.slices:
+        capture["stitched"] = await asyncio.to_thread(stitcher.render)
+        await artifacts.save("stitched_full_page", capture["stitched"])
 
-        for file in screenshots:
-            os.remove(file)
+    print(f"📸 Captured and OCRed {capture['slices']} viewport slices")
+    return capture
 
 
-async def try_click_apply_button(page):
+async def click_apply_candidate(page, candidate, stage: str, label: str) -> bool:
+    """
+    Scrolls to the candidate, waits for it to settle and clicks it, falling
+    back to a JS click for enabled elements that are not visible.
+    """
+    async with span("click", path=stage) as s:
+        clicked = await _click_candidate(page, candidate, stage, label)
+        s.outcome = "clicked" if clicked else "not_interactable"
+    return clicked
+
+
+async def _click_candidate(page, candidate, stage: str, label: str) -> bool:
+    try:
+        await candidate.scroll_into_view_if_needed(timeout=3000)  # ✅ Awaiting the scroll action
+    except Exception as se:
+        print(f"⚠️ scroll_into_view_if_needed failed ({label}): {se}")
+
+    await wait_for_element_stable(candidate, f"{stage}_stable", 1000)
+
+    if await candidate.is_visible():  # ✅ Awaiting visibility check
+        await click_and_wait(page, candidate.click, f"{stage}_click", 5000)
+        print(f"✅ Clicked the Apply button ({label})")
+
+    elif await candidate.is_enabled():  # ✅ Awaiting enabled check
+        handle = await candidate.element_handle()  # ✅ Awaiting handle retrieval
+        if handle:
+            await click_and_wait(page, lambda: page.evaluate("(el) => el.click()", handle), f"{stage}_click", 5000)
+            print(f"✅ Clicked the Apply button (JS click on enabled element, {label})")
+        else:
+            print(f"❌ Could not obtain element handle for candidate ({label})")
+            return False
+    else:
+        print(f"❌ Candidate found but not interactable ({label})")
+        return False
+
+    return True
+
+
+async def try_cached_apply_button(page, key: str) -> bool:
+    entry = selector_cache.lookup(key, "apply_button")
+    if not entry:
+        return False
+
+    print(f"⚡ Trying cached Apply selector for {key}: {entry['selector']}")
+    candidate = page.locator(entry["selector"]).first
+    try:
+        if entry["strategy"] == "lazy":
+            # Learned on the lazy path: the button only renders after scrolling
+            await scroll_until_attached(page, candidate)
+        await candidate.wait_for(state="attached", timeout=3000)
+        clicked = await click_apply_candidate(page, candidate, "cached_apply", "cached selector")
+    except Exception as e:
+        print(f"⚠️ Cached Apply selector failed: {e}")
+        clicked = False
+
+    if not clicked:
+        selector_cache.record_failure(key, "apply_button")
+        return False
+
+    await capture_artifact(page, "after_apply")
+    selector_cache.record_success(key, "apply_button", entry["selector"], entry["strategy"], cached=True)
+    return True
+
+
+async def scroll_until_attached(page, candidate, max_scrolls: int = 10):
+    """
+    Scrolls one viewport at a time until the locator matches or the page
+    stops growing, the way the lazy search found it.
+    """
+    previous_height = 0
+    for _ in range(max_scrolls):
+        if await candidate.count():
+            return
+        await page.evaluate("window.scrollBy(0, window.innerHeight)")
+        await settle(page, "cached_lazy_scroll", 2000, network=True)
+        new_height = await page.evaluate("document.body.scrollHeight")
+        if new_height == previous_height:
+            return
+        previous_height = new_height
+
+
+async def try_click_apply_button(page, key: str = None, use_cache: bool = True):
+    key = key or site_fingerprint(page.url)
+    if use_cache and await try_cached_apply_button(page, key):
+        return True
+
     print("🔍 Looking for an Apply button using robust candidate scoring (standard logic)...")
     pattern = re.compile(r"(apply|submit resume|start application)", re.IGNORECASE)
-    candidate, score = await get_best_apply_candidate(page, pattern)
+    candidate, score, item = await find_apply_candidate(page, pattern)
 
     if not candidate or score<1:
         print("❌ No candidate found for Apply button (standard logic).")
         return False
 
-    try:
-        text = await candidate.inner_text()  # ✅ Awaiting text retrieval
-        print(f"🔍 Best candidate found with score {score} and text: '{text.strip()}'")
-    except Exception:
-        pass
+    print(f"🔍 Best candidate found with score {score} and text: '{item['text'].strip()}'")
 
     try:
-        await candidate.scroll_into_view_if_needed(timeout=3000)  # ✅ Awaiting the scroll action
-        await asyncio.sleep(1)
-
-        if await candidate.is_visible():  # ✅ Awaiting visibility check
-            await candidate.click()  # ✅ Awaiting click action
-            print("✅ Clicked the Apply button (visible)")
-
-        elif await candidate.is_enabled():  # ✅ Awaiting enabled check
-            handle = await candidate.element_handle()  # ✅ Awaiting handle retrieval
-            if handle:
-                await page.evaluate("(el) => el.click()", handle)
-                print("✅ Clicked the Apply button (JS click on enabled element)")
-            else:
-                print("❌ Could not obtain element handle for candidate")
-                return False
-        else:
-            print("❌ Candidate found but not interactable")
+        if not await click_apply_candidate(page, candidate, "apply", "standard logic"):
             return False
 
-        await asyncio.sleep(5)
-        await page.screenshot(path="after_apply.png")
+        await capture_artifact(page, "after_apply")
+        selector_cache.record_success(key, "apply_button", candidate_selector(item), "standard")
         return True
 
     except Exception as e:
@@ -162,133 +405,205 @@ async def try_click_apply_button(page):
         return False
 
 
-async def is_embedded_form_present(page) -> bool:
-    print("🔍 Checking for embedded application form using scoring system...")
+FORM_FIELD_SELECTOR = "input, textarea, select"
+ATS_FRAME_HOSTS = ["greenhouse.io", "lever.co", "workday.com"]
 
-    # Layer 1: Traditional <form> tag with enough inputs
-    form_input_count = await page.locator("form input, form textarea, form select").count()
-    if form_input_count >= 3:
-        print(f"✅ Found <form> tag with {form_input_count} fields. Passing immediately.")
-        return True
+# Returns the metadata of every form field in a frame as one array.
+COLLECT_FORM_FIELDS_JS = """
+(selector) => Array.from(document.querySelectorAll(selector), el => ({
+    placeholder: (el.getAttribute("placeholder") || "").toLowerCase(),
+    ariaLabel: (el.getAttribute("aria-label") || "").toLowerCase(),
+    name: (el.getAttribute("name") || "").toLowerCase(),
+    type: (el.getAttribute("type") || "").toLowerCase(),
+    inForm: el.closest("form") !== null,
+}))
+"""
 
-    # Layer 2: Scoring non-semantic inputs
-    inputs = page.locator("input, textarea, select")
-    total_fields = await inputs.count()
-    score = 0
 
-    for i in range(total_fields):
-        el = inputs.nth(i)
+async def collect_form_fields(frame) -> list:
+    try:
+        return await frame.evaluate(COLLECT_FORM_FIELDS_JS, FORM_FIELD_SELECTOR)
+    except Exception as e:
+        # Detached or navigating frames simply contribute no fields
+        print(f"⚠️ Could not read form fields from frame ({frame.url}): {e}")
+        return []
 
-        try:
-            # Get useful metadata
-            placeholder = (await el.get_attribute("placeholder") or "").lower()
-            aria_label = (await el.get_attribute("aria-label") or "").lower()
-            name_attr = (await el.get_attribute("name") or "").lower()
-            field_type = (await el.get_attribute("type") or "").lower()
-            associated_text = f"{placeholder} {aria_label} {name_attr}"
-
-            # Scoring rules
-            if "email" in associated_text:
-                score += 3
-            if "phone" in associated_text:
-                score += 3
-            if "resume" in associated_text or "cv" in associated_text:
-                score += 10
-            if "upload" in associated_text or "file" in associated_text:
-                score += 5
-            if "linkedin" in associated_text or "github" in associated_text:
-                score += 3
-            if "cover" in associated_text:
-                score += 5
-            if field_type == "file":
-                score += 10
 
-        except Exception:
-            continue
+async def collect_form_fields_by_frame(page) -> list:
+    """
+    Returns (frame, fields) pairs for the main page and every frame,
+    with a single round trip per frame.
+    """
+    frames = page.frames
+    results = await asyncio.gather(*(collect_form_fields(frame) for frame in frames))
+    return list(zip(frames, results))
+
+
+def score_form_fields(fields) -> int:
+    score = 0
+
+    for field in fields:
+        associated_text = f"{field['placeholder']} {field['ariaLabel']} {field['name']}"
+
+        # Scoring rules
+        if "email" in associated_text:
+            score += 3
+        if "phone" in associated_text:
+            score += 3
+        if "resume" in associated_text or "cv" in associated_text:
+            score += 10
+        if "upload" in associated_text or "file" in associated_text:
+            score += 5
+        if "linkedin" in associated_text or "github" in associated_text:
+            score += 3
+        if "cover" in associated_text:
+            score += 5
+        if field["type"] == "file":
+            score += 10
 
     # Bonus for sufficient number of fields
-    if total_fields >= 4:
+    if len(fields) >= 4:
         score += 5
 
+    return score
+
+
+FORM_TAG_SELECTOR = "form input, form textarea, form select"
+
+
+async def detect_embedded_form(page):
+    """
+    Returns (strategy, selector) for the layer that detected a form, or None.
+    """
+    async with span("form_detection") as s:
+        detected = await _detect_embedded_form(page)
+        s.outcome = detected[0] if detected else "none"
+    return detected
+
+
+async def _detect_embedded_form(page):
+    fields_by_frame = await collect_form_fields_by_frame(page)
+    main_fields = next((fields for frame, fields in fields_by_frame if frame == page.main_frame), [])
+
+    # Layer 1: Traditional <form> tag with enough inputs
+    form_input_count = sum(1 for field in main_fields if field["inForm"])
+    if form_input_count >= 3:
+        print(f"✅ Found <form> tag with {form_input_count} fields. Passing immediately.")
+        return "form_tag", FORM_TAG_SELECTOR
+
+    # Layer 2: Scoring non-semantic inputs
+    score = score_form_fields(main_fields)
+
     print(f"🧮 Application form field score: {score}")
 
     if score >= 15:
         print("✅ High enough score to confirm an embedded application form.")
-        return True
+        return "field_score", FORM_FIELD_SELECTOR
 
     # Layer 3: Iframe check for known ATS platforms
-    for frame in page.frames:
+    for frame, fields in fields_by_frame:
         frame_url = frame.url.lower()
-        if any(host in frame_url for host in ["greenhouse.io", "lever.co", "workday.com"]):
-            frame_inputs = await frame.locator("input, textarea, select").count()
-            if frame_inputs > 2:
-                print(f"✅ Detected embedded application form in iframe ({frame_url}) with {frame_inputs} fields.")
-                return True
+        host = next((host for host in ATS_FRAME_HOSTS if host in frame_url), None)
+        if host and len(fields) > 2:
+            print(f"✅ Detected embedded application form in iframe ({frame_url}) with {len(fields)} fields.")
+            return "ats_iframe", host
 
-    print("❌ No application form detected.")
-    return False
+    return None
+
+
+async def is_embedded_form_present(page) -> bool:
+    print("🔍 Checking for embedded application form using scoring system...")
+
+    detected = await detect_embedded_form(page)
+    if detected is None:
+        print("❌ No application form detected.")
+        return False
 
+    strategy, selector = detected
+    selector_cache.record_success(form_fingerprint(page.url), "embedded_form", selector, strategy)
+    return True
 
-async def lazy_scroll_and_find_apply_button(page):
-    print("🔍 Trying lazy-loading approach for Apply button using robust candidate scoring...")
+
+async def try_cached_form(page, key: str) -> bool:
+    """
+    Re-checks only the layer that found a form on this host last time.
+    """
+    entry = selector_cache.lookup(key, "embedded_form")
+    if not entry:
+        return False
+
+    print(f"⚡ Checking cached embedded-form strategy for {key}: {entry['strategy']}")
+    found = False
+    try:
+        if entry["strategy"] == "form_tag":
+            found = await page.locator(entry["selector"]).count() >= 3
+        elif entry["strategy"] == "ats_iframe":
+            frames = [frame for frame in page.frames if entry["selector"] in frame.url.lower()]
+            counts = await asyncio.gather(*(frame.locator(FORM_FIELD_SELECTOR).count() for frame in frames))
+            found = any(count > 2 for count in counts)
+        else:
+            found = await detect_embedded_form(page) is not None
+    except Exception as e:
+        print(f"⚠️ Cached embedded-form check failed: {e}")
+
+    if found:
+        selector_cache.record_success(key, "embedded_form", entry["selector"], entry["strategy"], cached=True)
+    else:
+        selector_cache.record_failure(key, "embedded_form")
+    return found
+
+
+async def lazy_scroll_and_find_apply_button(page, key: str = None):
+    # Taken before the click: a click that navigates (e.g. to an ATS) must not
+    # store this site's selector under the destination's key
+    key = key or site_fingerprint(page.url)
+    print("🔍 Trying lazy-loading approach for Apply button using incremental candidate scoring...")
     pattern = re.compile(r"(apply|submit resume|start application)", re.IGNORECASE)
     previous_height = 0
     max_scroll_attempts = 10
-    candidate = None
-
-    for attempt in range(max_scroll_attempts):
-        candidate, score = await get_best_apply_candidate(page, pattern)
+    item, score = None, -9999
+    scored = 0
 
-        if candidate:
-            try:
-                text = await candidate.inner_text()  # ✅ Awaiting text retrieval
-            except Exception:
-                text = ""
-
-            print(f"🔍 (Lazy) Candidate found on scroll attempt {attempt + 1} with score {score} and text: '{text}'")
+    try:
+        for attempt in range(max_scroll_attempts):
+            # Only candidates added or scrolled into view since the last pass are scored
+            async with span("candidate_scoring", path="lazy") as s:
+                batch = await drain_new_candidates(page, pattern)
+                best, best_score = pick_best_candidate(batch)
+                s.outcome = "found" if best is not None and best_score > 0 else "none"
+            scored += len(batch)
+
+            if best is not None and best_score > score:
+                item, score = best, best_score
+                print(f"🔍 (Lazy) Candidate found on scroll attempt {attempt + 1} with score {score} and text: '{item['text']}'")
             if score > 0:
                 break
 
-        # Scroll down to load more content
-        await page.evaluate("window.scrollBy(0, window.innerHeight)")
-        await page.wait_for_timeout(2000)
-        new_height = await page.evaluate("document.body.scrollHeight")
+            # Scroll down to load more content
+            await page.evaluate("window.scrollBy(0, window.innerHeight)")
+            await settle(page, "lazy_scroll", 2000, network=True)
+            new_height = await page.evaluate("document.body.scrollHeight")
 
-        if new_height == previous_height:
-            print("Reached the bottom of the page.")
-            break
+            if new_height == previous_height:
+                print("Reached the bottom of the page.")
+                break
 
-        previous_height = new_height
+            previous_height = new_height
+    finally:
+        await stop_candidate_watch(page)
 
-    if not candidate:
+    print(f"🔢 (Lazy) Scored {scored} new candidates in total")
+    if not item:
         print("❌ No Apply button found via lazy-loading approach.")
         return False
 
     try:
-        try:
-            await candidate.scroll_into_view_if_needed(timeout=3000)
-        except Exception as se:
-            print(f"⚠️ scroll_into_view_if_needed failed (lazy-loading): {se}")
-
-        await page.wait_for_timeout(1000)
-
-        if await candidate.is_visible():
-            await candidate.click()
-            print("✅ Clicked the Apply button (lazy-loading approach)")
-        elif await candidate.is_enabled():
-            handle = await candidate.element_handle()  # ✅ Awaiting the handle retrieval
-            if handle:
-                await page.evaluate("(el) => el.click()", handle)
-                print("✅ Clicked the Apply button (JS click in lazy-loading approach)")
-            else:
-                print("❌ Could not obtain element handle for candidate in lazy-loading approach")
-                return False
-        else:
-            print("❌ Candidate found in lazy-loading approach but not interactable")
+        candidate = page.locator(f"[{CANDIDATE_ATTR}='{item['index']}']")
+        if not await click_apply_candidate(page, candidate, "lazy_apply", "lazy-loading approach"):
             return False
 
-        await page.wait_for_timeout(5000)
-        await page.screenshot(path="after_apply_lazy.png")
+        await capture_artifact(page, "after_apply_lazy")
+        selector_cache.record_success(key, "apply_button", candidate_selector(item), "lazy")
         return True
 
     except Exception as e:
@@ -296,15 +611,137 @@ async def lazy_scroll_and_find_apply_button(page):
         return False
 
 
-async def compute_candidate_score(candidate, page) -> int:
+CANDIDATE_SELECTOR = "button, a, div[role='button']"
+CANDIDATE_ATTR = "data-apply-candidate"
+# Attributes stable enough to re-find a button on the next visit to the same host
+STABLE_SELECTOR_ATTRS = ["id", "data-testid", "data-qa", "data-automation-id", "aria-label"]
+
+# Describes one candidate for scoring: text, tag, bounding box, visibility,
+# enabled state and the attributes candidate_selector can build on. Returns
+# null when the text does not match. Shared by both candidate scripts below.
+DESCRIBE_CANDIDATE_JS = """
+(el, pattern, stableAttrs) => {
+    const text = (el.innerText || el.textContent || "").trim();
+    if (!pattern.test(text)) return null;
+
+    let box = null;
+    if (el.getClientRects().length) {
+        const r = el.getBoundingClientRect();
+        box = {x: r.x, y: r.y, width: r.width, height: r.height};
+    }
+    const style = window.getComputedStyle(el);
+    const visible = !!box && box.width > 0 && box.height > 0
+        && style.visibility !== "hidden" && style.display !== "none";
+    const enabled = !el.disabled && el.getAttribute("aria-disabled") !== "true";
+
+    const attrs = {};
+    for (const name of stableAttrs) {
+        const value = el.getAttribute(name);
+        if (value) attrs[name] = value;
+    }
+    return {text, tag: el.tagName, box, visible, enabled, attrs};
+}
+"""
+
+# Collects every candidate in a single round trip. Each match is stamped with
+# its index so the winner can be handed back as a locator without
+# re-querying the page.
+COLLECT_CANDIDATES_JS = """
+([selector, attr, source, flags, stableAttrs]) => {
+    const describe = """ + DESCRIBE_CANDIDATE_JS.strip() + """;
+    document.querySelectorAll(`[${attr}]`).forEach(el => el.removeAttribute(attr));
+    const pattern = new RegExp(source, flags);
+    const snapshot = [];
+    document.querySelectorAll(selector).forEach(el => {
+        const item = describe(el, pattern, stableAttrs);
+        if (!item) return;
+
+        const index = snapshot.length;
+        el.setAttribute(attr, String(index));
+        snapshot.push({index, ...item});
+    });
+    return snapshot;
+}
+"""
+
+
+# Incremental variant of COLLECT_CANDIDATES_JS for the lazy-scroll search.
+# The first call installs a MutationObserver that queues candidates added to
+# the DOM (or whose content changed) and an IntersectionObserver that
+# re-queues hidden candidates once they scroll into view. Each call drains
+# only that queue, so the cost follows the new content, not the page size.
+# Stamps are prefixed with "lazy-" so they never clash with a full snapshot.
+DRAIN_NEW_CANDIDATES_JS = """
+([selector, attr, source, flags, stableAttrs]) => {
+    const describe = """ + DESCRIBE_CANDIDATE_JS.strip() + """;
+    let watch = window.__applyCandidateWatch;
+    if (!watch) {
+        watch = window.__applyCandidateWatch = {pending: new Set(), next: 0};
+        const enqueue = node => {
+            const owner = node.closest(selector);
+            if (owner) watch.pending.add(owner);
+            node.querySelectorAll(selector).forEach(el => watch.pending.add(el));
+        };
+        watch.intersection = new IntersectionObserver(entries => entries.forEach(entry => {
+            if (!entry.isIntersecting) return;
+            watch.intersection.unobserve(entry.target);
+            watch.pending.add(entry.target);
+        }));
+        watch.mutation = new MutationObserver(records => records.forEach(record => {
+            // Text-only updates (e.g. "Loading..." -> "Apply now") mutate a text node in place
+            if (record.type === "characterData") {
+                if (record.target.parentElement) enqueue(record.target.parentElement);
+                return;
+            }
+            record.addedNodes.forEach(node => {
+                const el = node.nodeType === 1 ? node : node.parentElement;
+                if (el) enqueue(el);
+            });
+        }));
+        watch.mutation.observe(document.documentElement, {childList: true, characterData: true, subtree: true});
+        enqueue(document.documentElement);
+    }
+
+    const pattern = new RegExp(source, flags);
+    const batch = [];
+    const pending = Array.from(watch.pending);
+    watch.pending.clear();
+    for (const el of pending) {
+        if (!el.isConnected) continue;
+        const item = describe(el, pattern, stableAttrs);
+        if (!item) continue;
+        if (!item.visible) watch.intersection.observe(el);
+
+        const index = "lazy-" + watch.next++;
+        el.setAttribute(attr, index);
+        batch.push({index, ...item});
+    }
+    return batch;
+}
+"""
+
+STOP_CANDIDATE_WATCH_JS = """
+() => {
+    const watch = window.__applyCandidateWatch;
+    if (!watch) return;
+    watch.mutation.disconnect();
+    watch.intersection.disconnect();
+    delete window.__applyCandidateWatch;
+}
+"""
+
+
+def _js_regex(pattern):
+    flags = "i" if pattern.flags & re.IGNORECASE else ""
+    return pattern.pattern, flags
+
+
+def score_candidate(text: str, tag: str = None, box: dict = None) -> int:
+    """
+    Applies the keyword, tag and size rules to already collected candidate data.
+    """
     score = 0
-    try:
-        text = await candidate.inner_text()
-        text = text.strip().lower()
-    except Exception:
-        text = ""
-
-    print(f"🧐 Scoring candidate: '{text}'")
+    text = (text or "").strip().lower()
 
     if "apply" in text:
         score += 10
@@ -322,40 +759,152 @@ async def compute_candidate_score(candidate, page) -> int:
         score -=20
 
     # Tag bonuses
+    if tag:
+        tag = tag.lower()
+        if tag == "button":
+            score += 5
+        elif tag == "a":
+            score += 3
+        elif tag == "div":
+            score += 1
+
+    # Bounding box size check
+    if box:
+        if box["width"] < 50 or box["height"] < 20:
+            score -= 10
+        else:
+            score += 2
+
+    return score
+
+
+async def compute_candidate_score(candidate, page) -> int:
+    try:
+        text = await candidate.inner_text()
+        text = text.strip().lower()
+    except Exception:
+        text = ""
+
+    print(f"🧐 Scoring candidate: '{text}'")
+
     try:
         tag = await candidate.evaluate("el => el.tagName")
-        if tag:
-            tag = tag.lower()
-            if tag == "button":
-                score += 5
-            elif tag == "a":
-                score += 3
-            elif tag == "div":
-                score += 1
     except Exception:
-        pass
+        tag = None
 
-    # Bounding box size check
     try:
         box = await candidate.bounding_box()
-        if box:
-            if box["width"] < 50 or box["height"] < 20:
-                print(f"⚠️ Small button detected: {box}")
-                score -= 10
-            else:
-                score += 2
+        if box and (box["width"] < 50 or box["height"] < 20):
+            print(f"⚠️ Small button detected: {box}")
     except Exception:
-        pass
+        box = None
 
+    score = score_candidate(text, tag, box)
     print(f"🔢 Final score: {score}")
     return score
 
 
+async def collect_apply_candidates(page, pattern) -> list:
+    """
+    Returns a snapshot of every Apply-button candidate on the page.
+    """
+    source, flags = _js_regex(pattern)
+    try:
+        return await page.evaluate(COLLECT_CANDIDATES_JS,
+                                   [CANDIDATE_SELECTOR, CANDIDATE_ATTR, source, flags, STABLE_SELECTOR_ATTRS])
+    except Exception as e:
+        print(f"⚠️ Candidate snapshot failed: {e}")
+        return []
+
+
+async def drain_new_candidates(page, pattern) -> list:
+    """
+    Returns snapshot entries for candidates that appeared since the previous call.
+    The first call on a page returns every candidate and starts watching.
+    """
+    source, flags = _js_regex(pattern)
+    try:
+        return await page.evaluate(DRAIN_NEW_CANDIDATES_JS,
+                                   [CANDIDATE_SELECTOR, CANDIDATE_ATTR, source, flags, STABLE_SELECTOR_ATTRS])
+    except Exception as e:
+        print(f"⚠️ Incremental candidate snapshot failed: {e}")
+        return []
+
+
+async def stop_candidate_watch(page):
+    try:
+        await page.evaluate(STOP_CANDIDATE_WATCH_JS)
+    except Exception:
+        pass
+
+
+def pick_best_candidate(snapshot) -> (dict, int):
+    best, best_score = None, -9999
+    for item in snapshot:
+        score = score_candidate(item["text"], item["tag"], item["box"])
+        item["score"] = score
+        if score > best_score:
+            best, best_score = item, score
+    return best, best_score
+
+
+def _css_string(value: str) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def candidate_selector(item) -> str:
+    """
+    Builds a selector for a snapshot item that should still match on the next
+    visit: a stable attribute when there is one, otherwise the exact text.
+    """
+    tag = item["tag"].lower()
+    if tag == "div":
+        tag = "div[role='button']"
+
+    for name in STABLE_SELECTOR_ATTRS:
+        value = item.get("attrs", {}).get(name)
+        # Skip generated values such as "btn-83412957"
+        if value and not re.search(r"\d{4,}", value):
+            return f"{tag}[{name}={_css_string(value)}]"
+
+    text = " ".join(item["text"].split())
+    if text and len(text) <= 60:
+        return f"{tag}:text-is({_css_string(text)})"
+    return None
+
+
+async def find_apply_candidate(page, pattern) -> (object, int, dict):
+    """
+    Returns the best candidate as a locator, its score and its snapshot entry.
+    All candidates are scored from one in-page snapshot; only the winner
+    comes back as a locator.
+    """
+    async with span("candidate_scoring") as s:
+        snapshot = await collect_apply_candidates(page, pattern)
+        best, best_score = pick_best_candidate(snapshot)
+        s.outcome = "found" if best is not None and best_score > 0 else "none"
+
+    if best is None:
+        return None, best_score, None
+
+    print(f"🔢 Scored {len(snapshot)} candidates, best: '{best['text'][:80]}' ({best_score})")
+    return page.locator(f"[{CANDIDATE_ATTR}='{best['index']}']"), best_score, best
+
+
 async def get_best_apply_candidate(page, pattern) -> (object, int):
     """
     Returns the candidate element with the highest score and its score.
     """
-    candidates = page.locator("button, a, div[role='button']", has_text=pattern)
+    candidate, score, _ = await find_apply_candidate(page, pattern)
+    return candidate, score
+
+
+async def get_best_apply_candidate_per_element(page, pattern) -> (object, int):
+    """
+    Per-element scoring path (several round trips per candidate).
+    Kept as the reference implementation for benchmarks/bench_apply_candidates.py.
+    """
+    candidates = page.locator(CANDIDATE_SELECTOR, has_text=pattern)
     count = await candidates.count()
     best_candidate = None
     best_score = -9999
@@ -364,11 +913,11 @@ async def get_best_apply_candidate(page, pattern) -> (object, int):
         candidate = candidates.nth(i)
 
         try:
-            text = await candidate.inner_text()  # ✅ You need to await this call
+            text = await candidate.inner_text()
         except Exception:
             text = ""
 
-        score = await compute_candidate_score(candidate,page)  # ✅ Awaiting the compute function as well
+        score = await compute_candidate_score(candidate, page)
 
         print(f"Candidate {i}: text='{text}', score={score}")
 